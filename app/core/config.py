@@ -1,14 +1,18 @@
 # app/core/config.py
-import cloudinary
 from dotenv import load_dotenv
 import os
 
 load_dotenv()
 
-# Configuración de Cloudinary
-cloudinary.config(
-    cloud_name = os.getenv("CLOUDINARY_CLOUD_NAME"),
-    api_key = os.getenv("CLOUDINARY_API_KEY"),
-    api_secret = os.getenv("CLOUDINARY_API_SECRET"),
-    secure = True
-)
\ No newline at end of file
+# Configuración de Cloudinary. No se hace al importar el módulo: la llama el
+# backend de almacenamiento la primera vez que se usa, así arrancar la app no
+# importa el SDK ni necesita las credenciales.
+def configure_cloudinary():
+    import cloudinary
+
+    cloudinary.config(
+        cloud_name = os.getenv("CLOUDINARY_CLOUD_NAME"),
+        api_key = os.getenv("CLOUDINARY_API_KEY"),
+        api_secret = os.getenv("CLOUDINARY_API_SECRET"),
+        secure = True
+    )
@@ -1,15 +1,55 @@
 #database.py
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import os
 from dotenv import load_dotenv
 
+from app.core.db_metrics import InstrumentedAsyncQueuePool, InstrumentedQueuePool, instrument_engine
+from app.core.metrics import count_queries
+
 load_dotenv() # Carga las variables del archivo .env
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 
-engine = create_engine(DATABASE_URL)
+# Configuración del pool de conexiones (por proceso: con varios workers de
+# gunicorn el total es workers * (DB_POOL_SIZE + DB_MAX_OVERFLOW))
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+
+def _engine_options(url, poolclass):
+    # SQLite usa sus propios pools; las opciones de tamaño son para Postgres
+    if make_url(url).get_backend_name() == "sqlite":
+        return {}
+    return {
+        "poolclass": poolclass,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+engine = create_engine(DATABASE_URL, **_engine_options(DATABASE_URL, InstrumentedQueuePool))
+instrument_engine(engine, "sync")
+count_queries(engine)
+
+# SQLite no aplica las claves foráneas (ni ON DELETE CASCADE) si no se activan
+def _enable_sqlite_foreign_keys(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.close()
+
+def _configure_sqlite(sync_engine):
+    if sync_engine.dialect.name == "sqlite":
+        event.listen(sync_engine, "connect", _enable_sqlite_foreign_keys)
+
+_configure_sqlite(engine)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -21,4 +61,53 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+# --- MOTOR ASÍNCRONO ---
+# Los routers usan una sesión asíncrona (asyncpg en Postgres, aiosqlite en SQLite)
+# para no depender del threadpool de Starlette. El motor síncrono de arriba se
+# sigue usando para crear las tablas y en los trabajos en segundo plano.
+# Se puede indicar otra URL con ASYNC_DATABASE_URL.
+_ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+def get_async_database_url():
+    if os.getenv("ASYNC_DATABASE_URL"):
+        return os.getenv("ASYNC_DATABASE_URL")
+    url = make_url(DATABASE_URL)
+    url = url.set(drivername=_ASYNC_DRIVERS.get(url.get_backend_name(), url.drivername))
+    if url.get_backend_name() == "postgresql" and "sslmode" in url.query:
+        # asyncpg no entiende "sslmode" (de psycopg2); usa "ssl"
+        url = url.difference_update_query(["sslmode"]).update_query_dict({"ssl": url.query["sslmode"]})
+    return url
+
+_async_engine = None
+
+# El motor asíncrono se crea la primera vez que se usa
+def get_async_engine():
+    global _async_engine
+    if _async_engine is None:
+        async_url = get_async_database_url()
+        _async_engine = create_async_engine(async_url, **_engine_options(async_url, InstrumentedAsyncQueuePool))
+        instrument_engine(_async_engine.sync_engine, "async")
+        count_queries(_async_engine.sync_engine)
+        _configure_sqlite(_async_engine.sync_engine)
+    return _async_engine
+
+AsyncSessionLocal = async_sessionmaker(class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+async def get_async_db():
+    async with AsyncSessionLocal(bind=get_async_engine()) as db:
+        yield db
+
+
+async def dispose_engines():
+    """Cierra las conexiones de los dos motores (al apagar la app)."""
+    global _async_engine
+    if _async_engine is not None:
+        await _async_engine.dispose()
+        _async_engine = None
+    engine.dispose()
@@ -0,0 +1,112 @@
+# app/core/db_metrics.py
+# Métricas del pool de conexiones de SQLAlchemy: cuánto se espera para obtener
+# una conexión, cuántas hay en uso, el overflow y las invalidaciones.
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+
+class PoolMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {
+            "connects": 0,
+            "checkouts": 0,
+            "checkins": 0,
+            "invalidations": 0,
+            "soft_invalidations": 0,
+            "checkout_timeouts": 0,
+            "checkout_wait_seconds_total": 0.0,
+            "checkout_wait_seconds_max": 0.0,
+        }
+
+    def increment(self, name: str) -> None:
+        with self._lock:
+            self._stats[name] += 1
+
+    def record_wait(self, seconds: float, timed_out: bool = False) -> None:
+        with self._lock:
+            self._stats["checkout_wait_seconds_total"] += seconds
+            self._stats["checkout_wait_seconds_max"] = max(self._stats["checkout_wait_seconds_max"], seconds)
+            if timed_out:
+                self._stats["checkout_timeouts"] += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return dict(self._stats)
+
+
+_pool_metrics: dict[str, PoolMetrics] = {}
+# Se guarda el motor y no su pool: engine.dispose() lo sustituye por uno nuevo
+_engines = {}
+
+
+class _TimedCheckoutMixin:
+    # Medimos el tiempo que se tarda en conseguir una conexión del pool
+    # (incluida la espera cuando todas están ocupadas)
+    _metrics: PoolMetrics | None = None
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            if self._metrics is not None:
+                self._metrics.record_wait(time.perf_counter() - start, timed_out=True)
+            raise
+        if self._metrics is not None:
+            self._metrics.record_wait(time.perf_counter() - start)
+        return connection
+
+    # engine.dispose() crea el pool nuevo con recreate(): conserva los eventos
+    # registrados, pero no este atributo
+    def recreate(self):
+        pool = super().recreate()
+        pool._metrics = self._metrics
+        return pool
+
+
+class InstrumentedQueuePool(_TimedCheckoutMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_TimedCheckoutMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def instrument_engine(engine, name: str) -> None:
+    """Registra los eventos del pool del motor (síncrono) bajo el nombre indicado."""
+    metrics = _pool_metrics.setdefault(name, PoolMetrics())
+    pool = engine.pool
+    _engines[name] = engine
+    if isinstance(pool, _TimedCheckoutMixin):
+        pool._metrics = metrics
+
+    event.listen(pool, "connect", lambda *args: metrics.increment("connects"))
+    event.listen(pool, "checkout", lambda *args: metrics.increment("checkouts"))
+    event.listen(pool, "checkin", lambda *args: metrics.increment("checkins"))
+    event.listen(pool, "invalidate", lambda *args: metrics.increment("invalidations"))
+    event.listen(pool, "soft_invalidate", lambda *args: metrics.increment("soft_invalidations"))
+
+
+def get_pool_stats() -> dict:
+    stats = {}
+    for name, metrics in _pool_metrics.items():
+        pool_stats = metrics.snapshot()
+        pool = _engines[name].pool
+        # Estado actual del pool (solo los QueuePool llevan la cuenta)
+        if isinstance(pool, QueuePool):
+            pool_stats.update({
+                "size": pool.size(),
+                "checked_in": pool.checkedin(),
+                "checked_out": pool.checkedout(),
+                "overflow": pool.overflow(),
+            })
+        pool_stats["checkout_wait_seconds_avg"] = (
+            pool_stats["checkout_wait_seconds_total"] / pool_stats["checkouts"] if pool_stats["checkouts"] else 0.0
+        )
+        stats[name] = pool_stats
+    return stats
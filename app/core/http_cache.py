@@ -0,0 +1,48 @@
+# app/core/http_cache.py
+# Peticiones condicionales (ETag / Last-Modified). Si el cliente ya tiene la
+# versión actual, la ruta responde 304 sin cuerpo.
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+
+
+def as_utc(value: datetime) -> datetime:
+    # SQLite devuelve las fechas sin zona horaria; las guardamos siempre en UTC
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+
+def format_http_date(value: datetime) -> str:
+    return format_datetime(as_utc(value).astimezone(timezone.utc), usegmt=True)
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    # Comparación débil: W/"x" equivale a "x"
+    return "*" in tags or etag.removeprefix("W/") in [tag.removeprefix("W/") for tag in tags]
+
+
+def is_not_modified(
+    if_none_match: str | None,
+    if_modified_since: str | None,
+    etag: str,
+    last_modified: datetime | None,
+) -> bool:
+    """True si el cliente ya tiene esta versión (If-None-Match tiene prioridad)."""
+    if if_none_match:
+        return etag_matches(if_none_match, etag)
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        # Las fechas HTTP no tienen fracciones de segundo
+        return as_utc(last_modified).replace(microsecond=0) <= as_utc(since)
+    return False
+
+
+def cache_headers(etag: str, last_modified: datetime | None) -> dict:
+    headers = {"ETag": etag}
+    if last_modified is not None:
+        headers["Last-Modified"] = format_http_date(last_modified)
+    return headers
@@ -0,0 +1,75 @@
+# app/core/identity_cache.py
+# Caché de identidades ya validadas: evita buscar al usuario en la BD en cada
+# petición protegida. La clave es el propio token y cada entrada vive como
+# mucho IDENTITY_CACHE_TTL segundos (y nunca más que el token). Con más de
+# IDENTITY_CACHE_MAX_ENTRIES se descarta la usada hace más tiempo (LRU).
+# Si un usuario cambia o se elimina, sus entradas se descartan (en este proceso).
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import event
+
+from app.models import user as user_model
+from app.schemas import user as user_schema
+
+# La invalidación por eventos del ORM solo llega al proceso que hizo el cambio:
+# con varios workers, los demás pueden seguir aceptando la identidad anterior
+# (p. ej. de un usuario eliminado) hasta IDENTITY_CACHE_TTL segundos. Es el
+# retraso máximo que se acepta; con 0 se desactiva la caché.
+IDENTITY_CACHE_TTL = float(os.getenv("IDENTITY_CACHE_TTL", "60"))
+IDENTITY_CACHE_MAX_ENTRIES = int(os.getenv("IDENTITY_CACHE_MAX_ENTRIES", "10000"))
+
+
+class IdentityCache:
+    def __init__(self, ttl: float = IDENTITY_CACHE_TTL, max_entries: int = IDENTITY_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[float, user_schema.User]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, token: str) -> user_schema.User | None:
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                return None
+            expires_at, user = entry
+            if expires_at <= time.monotonic():
+                del self._entries[token]
+                return None
+            self._entries.move_to_end(token)
+            return user
+
+    def set(self, token: str, user: user_schema.User, token_exp: float | None = None) -> None:
+        if self.ttl <= 0:
+            return
+        ttl = self.ttl
+        if token_exp is not None:
+            ttl = min(ttl, token_exp - time.time())
+            if ttl <= 0:
+                return
+        with self._lock:
+            self._entries[token] = (time.monotonic() + ttl, user)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate_user(self, user_id: int) -> None:
+        with self._lock:
+            for token in [token for token, (_, user) in self._entries.items() if user.id == user_id]:
+                del self._entries[token]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+identity_cache = IdentityCache()
+
+
+# Cualquier cambio o borrado de un usuario invalida sus identidades cacheadas
+@event.listens_for(user_model.User, "after_update")
+@event.listens_for(user_model.User, "after_delete")
+def _invalidate_changed_user(mapper, connection, target):
+    identity_cache.invalidate_user(target.id)
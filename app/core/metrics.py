@@ -0,0 +1,226 @@
+# app/core/metrics.py
+# Métricas por petición en formato Prometheus (se publican en /metrics):
+# latencia por ruta, peticiones en curso, tamaño de las respuestas, número de
+# consultas SQL por petición y tiempo gastado en servicios externos
+# (Cloudinary, descarga de imágenes). También se incluyen las estadísticas que
+# ya llevan otros módulos (pool de BD, hashing de contraseñas, imágenes).
+#
+# Con SLOW_REQUEST_SECONDS > 0 se registran en el log las peticiones lentas; con
+# SLOW_REQUEST_PROFILE_RATE > 0 una fracción de las peticiones se perfila con
+# cProfile y, si resulta lenta, el log incluye las funciones más costosas.
+# OJO: cProfile mide el hilo del event loop mientras dura la petición, no la
+# petición: incluye las corrutinas de las demás peticiones que se ejecutaron a
+# la vez y no incluye lo que esta mandó al threadpool. Sirve para ver qué
+# bloquea el event loop, no para atribuir todo el tiempo a la ruta del log.
+import cProfile
+import io
+import logging
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from prometheus_client import Counter, Gauge, Histogram, REGISTRY
+from prometheus_client.core import GaugeMetricFamily
+from sqlalchemy import event
+
+SLOW_REQUEST_SECONDS = float(os.getenv("SLOW_REQUEST_SECONDS", "0"))
+SLOW_REQUEST_PROFILE_RATE = float(os.getenv("SLOW_REQUEST_PROFILE_RATE", "0"))
+SLOW_REQUEST_PROFILE_LINES = 15
+
+logger = logging.getLogger("app.slow_requests")
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Latencia de las peticiones HTTP",
+    ["method", "route", "status"],
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight",
+    "Peticiones HTTP en curso",
+)
+RESPONSE_SIZE = Histogram(
+    "http_response_size_bytes",
+    "Tamaño del cuerpo de las respuestas HTTP",
+    ["method", "route"],
+    buckets=(100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000, 100_000_000),
+)
+DB_QUERIES_PER_REQUEST = Histogram(
+    "http_request_db_queries",
+    "Consultas SQL ejecutadas por petición",
+    ["method", "route"],
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100),
+)
+EXTERNAL_CALL_LATENCY = Histogram(
+    "external_call_duration_seconds",
+    "Duración de las llamadas a servicios externos",
+    ["service", "operation"],
+)
+EXTERNAL_CALL_ERRORS = Counter(
+    "external_call_errors_total",
+    "Llamadas a servicios externos que fallaron",
+    ["service", "operation"],
+)
+ADMISSION_DECISIONS = Counter(
+    "admission_decisions_total",
+    "Decisiones del control de admisión (admitted, rate_limited, shed, store_error)",
+    ["policy", "decision"],
+)
+ADMISSION_IN_FLIGHT = Gauge(
+    "admission_in_flight",
+    "Peticiones en curso en las rutas con límite de concurrencia",
+    ["policy"],
+)
+ADMISSION_QUEUE_WAIT = Histogram(
+    "admission_queue_wait_seconds",
+    "Tiempo en cola hasta obtener un hueco (o hasta ser rechazada)",
+    ["policy"],
+)
+
+
+@dataclass
+class RequestStats:
+    db_queries: int = 0
+    external_seconds: float = 0.0
+
+
+# Estadísticas de la petición en curso. Es un objeto mutable para que también
+# sumen las consultas hechas en el threadpool (que recibe una copia del contexto).
+_current_request: ContextVar[RequestStats | None] = ContextVar("current_request", default=None)
+
+
+def _count_query(*args):
+    stats = _current_request.get()
+    if stats is not None:
+        stats.db_queries += 1
+
+def count_queries(engine) -> None:
+    """Cuenta las consultas SQL del motor (síncrono) en la petición en curso."""
+    event.listen(engine, "before_cursor_execute", _count_query)
+
+
+@contextmanager
+def observe_external(service: str, operation: str):
+    """Mide una llamada a un servicio externo (y la suma a la petición en curso)."""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        EXTERNAL_CALL_ERRORS.labels(service, operation).inc()
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        EXTERNAL_CALL_LATENCY.labels(service, operation).observe(elapsed)
+        stats = _current_request.get()
+        if stats is not None:
+            stats.external_seconds += elapsed
+
+
+_profile_lock = threading.Lock()
+
+
+class MetricsMiddleware:
+    """Middleware ASGI que mide cada petición HTTP."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _current_request.set(stats)
+        status_code = 500
+        response_size = 0
+
+        async def send_wrapper(message):
+            nonlocal status_code, response_size
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            elif message["type"] == "http.response.body":
+                response_size += len(message.get("body", b""))
+            await send(message)
+
+        # Solo se perfila una petición a la vez (cProfile no admite varias).
+        # El perfil es del event loop entero (ver arriba), no solo de esta petición
+        profiler = None
+        if SLOW_REQUEST_PROFILE_RATE > 0 and random.random() < SLOW_REQUEST_PROFILE_RATE:
+            if _profile_lock.acquire(blocking=False):
+                profiler = cProfile.Profile()
+                profiler.enable()
+
+        REQUESTS_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            REQUESTS_IN_FLIGHT.dec()
+            if profiler is not None:
+                profiler.disable()
+                _profile_lock.release()
+            _current_request.reset(token)
+
+            # Usamos la plantilla de la ruta ("/designs/{design_id}/pdf") y no la URL,
+            # para no crear una serie por cada id
+            route = scope.get("route")
+            route_path = getattr(route, "path", "unmatched")
+            method = scope["method"]
+
+            REQUEST_LATENCY.labels(method, route_path, str(status_code)).observe(elapsed)
+            RESPONSE_SIZE.labels(method, route_path).observe(response_size)
+            DB_QUERIES_PER_REQUEST.labels(method, route_path).observe(stats.db_queries)
+
+            if SLOW_REQUEST_SECONDS > 0 and elapsed >= SLOW_REQUEST_SECONDS:
+                _log_slow_request(method, route_path, status_code, elapsed, stats, profiler)
+
+
+def _log_slow_request(method, route_path, status_code, elapsed, stats, profiler):
+    message = (
+        f"Petición lenta: {method} {route_path} -> {status_code} en {elapsed:.3f}s "
+        f"({stats.db_queries} consultas SQL, {stats.external_seconds:.3f}s en servicios externos)"
+    )
+    if profiler is not None:
+        output = io.StringIO()
+        pstats.Stats(profiler, stream=output).sort_stats("cumulative").print_stats(SLOW_REQUEST_PROFILE_LINES)
+        message += "\nPerfil del event loop durante la petición (incluye otras peticiones concurrentes):\n" + output.getvalue()
+    logger.warning(message)
+
+
+class _StatsCollector:
+    # Publica como gauges las estadísticas que ya calculan otros módulos.
+    # describe() vacío evita que el registro llame a collect() al registrarlo
+    # (los módulos de origen aún no están importados en ese momento).
+    def describe(self):
+        return []
+
+    def collect(self):
+        from app.core.db_metrics import get_pool_stats
+        from app.core.security import get_password_stats
+
+        sources = {"password_hash": get_password_stats()}
+        # El descargador de imágenes solo existe si ya se generó algún PDF;
+        # no lo importamos (ni requests/PIL) solo para publicar sus métricas
+        if "app.services.image_fetcher" in sys.modules:
+            sources["image_fetch"] = sys.modules["app.services.image_fetcher"].get_image_fetcher().get_stats()
+        if "app.services.uploads" in sys.modules:
+            sources["uploads"] = sys.modules["app.services.uploads"].get_stats()
+        if "app.services.storage_deletions" in sys.modules:
+            sources["storage_delete"] = sys.modules["app.services.storage_deletions"].get_stats()
+        for engine_name, pool_stats in get_pool_stats().items():
+            sources[f"db_pool_{engine_name}"] = pool_stats
+
+        for source, values in sources.items():
+            for key, value in values.items():
+                if isinstance(value, (int, float)):
+                    yield GaugeMetricFamily(f"jardin_{source}_{key}", f"{source}: {key}", value=value)
+
+
+REGISTRY.register(_StatsCollector())
@@ -0,0 +1,62 @@
+# app/core/migrations.py
+# Aplica las migraciones de Alembic (migrations/) hasta la última versión.
+# Las bases creadas antes de tener migraciones (con create_all) se marcan
+# primero como la versión inicial, para no intentar crear otra vez las tablas.
+#
+# Uso manual: python -m app.core.migrations   (o: alembic upgrade head)
+from contextlib import contextmanager
+from pathlib import Path
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import inspect, text
+
+from app.core.database import engine
+
+ALEMBIC_INI = Path(__file__).resolve().parents[2] / "alembic.ini"
+BASELINE_REVISION = "0001"
+# Clave del advisory lock de Postgres que serializa las migraciones (cualquier
+# entero de 64 bits; solo tiene que ser siempre el mismo)
+MIGRATION_LOCK_KEY = 7_202_610_180
+
+
+@contextmanager
+def migration_connection():
+    """Conexión en transacción para migrar (la usan la app y alembic)."""
+    # Con varios workers (gunicorn) todos migran al arrancar: en Postgres el
+    # primero toma un advisory lock hasta el commit y los demás esperan; cuando
+    # lo consiguen, la base ya está en la última versión y no hacen nada.
+    # Las migraciones corren en una sola transacción (el DDL de Postgres es
+    # transaccional), así que el lock de transacción las cubre enteras.
+    # En SQLite, recrear una tabla (batch) con las claves foráneas activas borraría
+    # en cascada las filas hijas al eliminar la tabla original. El PRAGMA no tiene
+    # efecto dentro de una transacción: se cambia antes de empezarla.
+    with engine.connect() as connection:
+        sqlite = connection.dialect.name == "sqlite"
+        if sqlite:
+            connection.exec_driver_sql("PRAGMA foreign_keys=OFF")
+            connection.commit()
+        try:
+            with connection.begin():
+                if connection.dialect.name == "postgresql":
+                    connection.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": MIGRATION_LOCK_KEY})
+                yield connection
+        finally:
+            if sqlite:
+                connection.exec_driver_sql("PRAGMA foreign_keys=ON")
+                connection.commit()
+
+
+def run_migrations():
+    config = Config(str(ALEMBIC_INI))
+    config.attributes["configure_logger"] = False
+    with migration_connection() as connection:
+        config.attributes["connection"] = connection
+        tables = inspect(connection).get_table_names()
+        if "alembic_version" not in tables and "users" in tables:
+            command.stamp(config, BASELINE_REVISION)
+        command.upgrade(config, "head")
+
+
+if __name__ == "__main__":
+    run_migrations()
@@ -0,0 +1,323 @@
+# app/core/rate_limit.py
+# Control de admisión de peticiones:
+#
+# - Límite de ritmo (token bucket) por usuario y ruta: cada usuario tiene un
+#   cubo por ruta con RATE_LIMIT_DEFAULT peticiones por periodo, y las rutas
+#   caras tienen además su propio cubo más estricto (RATE_LIMIT_UPLOAD,
+#   RATE_LIMIT_PDF, RATE_LIMIT_LOGIN). Formato: "30/m" = 30 por minuto, con
+#   ráfagas de hasta 30 (también "/s" y "/h"). Al superarlo se responde 429
+#   con Retry-After.
+# - Límite de concurrencia en las rutas caras (PDF, subidas, /token y alta de
+#   usuarios): como mucho CONCURRENCY_<NOMBRE> a la vez por proceso; las demás
+#   esperan en cola hasta ADMISSION_QUEUE_TIMEOUT segundos (y como mucho
+#   ADMISSION_MAX_WAITING por ruta) y si no, 429.
+#   /token y el alta se limitan por IP, porque aún no hay usuario autenticado.
+#
+# Los cubos se guardan en memoria del proceso (RATE_LIMIT_BACKEND=memory) o en
+# Redis (RATE_LIMIT_BACKEND=redis, RATE_LIMIT_REDIS_URL; requiere el paquete
+# "redis") para que el límite sea el mismo con varios workers. Si el almacén
+# falla, la petición se admite: el límite no debe tumbar la API.
+# RATE_LIMIT_ENABLED=false lo desactiva (p. ej. en el benchmark).
+import asyncio
+import logging
+import math
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+
+from fastapi import Depends, HTTPException, Request, status
+
+from app.core.metrics import ADMISSION_DECISIONS, ADMISSION_IN_FLIGHT, ADMISSION_QUEUE_WAIT
+from app.core.security import get_current_user
+from app.schemas import user as user_schema
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() in ("1", "true", "yes")
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "5"))
+ADMISSION_MAX_WAITING = int(os.getenv("ADMISSION_MAX_WAITING", "32"))
+
+logger = logging.getLogger("app.rate_limit")
+
+_PERIODS = {"s": 1, "m": 60, "h": 3600}
+
+
+@dataclass(frozen=True)
+class Rate:
+    capacity: int
+    per_second: float
+
+    @classmethod
+    def parse(cls, value: str) -> "Rate":
+        count, _, period = value.partition("/")
+        return cls(capacity=int(count), per_second=int(count) / _PERIODS[period.strip() or "s"])
+
+
+@dataclass(frozen=True)
+class Policy:
+    name: str
+    rate: Rate
+    max_concurrent: int | None = None
+
+
+def _policy(name: str, default_rate: str, default_concurrency: int | None = None) -> Policy:
+    concurrency = os.getenv(f"CONCURRENCY_{name.upper()}")
+    return Policy(
+        name=name,
+        rate=Rate.parse(os.getenv(f"RATE_LIMIT_{name.upper()}", default_rate)),
+        max_concurrent=int(concurrency) if concurrency else default_concurrency,
+    )
+
+POLICIES = {
+    "default": _policy("default", "120/m"),
+    "upload": _policy("upload", "20/m", 4),
+    "pdf": _policy("pdf", "30/m", 4),
+    "login": _policy("login", "10/m", 8),
+}
+
+
+class RateLimited(Exception):
+    def __init__(self, retry_after: float):
+        self.retry_after = retry_after
+
+
+def _too_many_requests(retry_after: float, detail: str):
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail=detail,
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+    )
+
+
+# --- ALMACENES DE CUBOS ---
+
+class RateLimitStore:
+    async def take(self, key: str, rate: Rate) -> float:
+        """Consume un token del cubo. Devuelve 0 si se admite o los segundos hasta el siguiente."""
+        raise NotImplementedError
+
+
+class MemoryRateLimitStore(RateLimitStore):
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def take(self, key: str, rate: Rate) -> float:
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at = self._buckets.pop(key, (rate.capacity, now))
+            tokens = min(rate.capacity, tokens + (now - updated_at) * rate.per_second)
+            if tokens >= 1:
+                tokens -= 1
+                wait = 0.0
+            else:
+                wait = (1 - tokens) / rate.per_second
+            self._buckets[key] = (tokens, now)
+            # Los cubos menos usados se descartan (equivale a tenerlos llenos)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return wait
+
+
+# Mismo algoritmo, atómico en Redis. La hora es la del servidor de Redis,
+# así todos los workers usan el mismo reloj.
+_TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local per_second = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated_at')
+local tokens = tonumber(bucket[1]) or capacity
+local updated_at = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated_at) * per_second)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = (1 - tokens) / per_second
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated_at', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / per_second) + 1)
+return tostring(wait)
+"""
+
+class RedisRateLimitStore(RateLimitStore):
+    def __init__(self, url: str):
+        import redis.asyncio
+
+        self.client = redis.asyncio.Redis.from_url(url)
+        self.script = self.client.register_script(_TOKEN_BUCKET_SCRIPT)
+
+    async def take(self, key: str, rate: Rate) -> float:
+        return float(await self.script(keys=[f"ratelimit:{key}"], args=[rate.capacity, rate.per_second]))
+
+
+_store: RateLimitStore | None = None
+
+def get_rate_limit_store() -> RateLimitStore:
+    global _store
+    if _store is None:
+        if os.getenv("RATE_LIMIT_BACKEND", "memory") == "redis":
+            _store = RedisRateLimitStore(os.getenv("RATE_LIMIT_REDIS_URL", "redis://localhost:6379/0"))
+        else:
+            _store = MemoryRateLimitStore()
+    return _store
+
+def set_rate_limit_store(store: RateLimitStore) -> None:
+    """Permite sustituir el almacén (por ejemplo, en pruebas)."""
+    global _store
+    _store = store
+
+
+# --- LÍMITE DE CONCURRENCIA ---
+
+class ConcurrencyLimiter:
+    """Como mucho "limit" peticiones a la vez; el resto espera en cola (FIFO) o se rechaza."""
+
+    def __init__(self, name: str, limit: int, max_waiting: int, timeout: float):
+        self.name = name
+        self.limit = limit
+        self.max_waiting = max_waiting
+        self.timeout = timeout
+        self.active = 0
+        self._waiters: deque[asyncio.Future] = deque()
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self):
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            return
+        if len(self._waiters) >= self.max_waiting:
+            raise RateLimited(retry_after=1)
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(future, self.timeout)
+        except asyncio.TimeoutError:
+            # Si el hueco llegó justo al vencer el plazo, lo aprovechamos
+            if not (future.done() and not future.cancelled()):
+                raise RateLimited(retry_after=self.timeout)
+        except asyncio.CancelledError:
+            # El cliente se fue: si ya nos habían pasado el hueco, lo devolvemos
+            if future.done() and not future.cancelled():
+                self.release()
+            raise
+        finally:
+            if future in self._waiters:
+                self._waiters.remove(future)
+            ADMISSION_QUEUE_WAIT.labels(self.name).observe(time.perf_counter() - start)
+
+    def release(self):
+        # El hueco pasa directamente al primero de la cola
+        while self._waiters:
+            future = self._waiters.popleft()
+            if not future.done():
+                future.set_result(None)
+                return
+        self.active -= 1
+
+
+_limiters = {
+    name: ConcurrencyLimiter(name, policy.max_concurrent, ADMISSION_MAX_WAITING, ADMISSION_QUEUE_TIMEOUT)
+    for name, policy in POLICIES.items()
+    if policy.max_concurrent
+}
+
+_stats_lock = threading.Lock()
+_decisions: dict[tuple[str, str], int] = {}
+
+
+def _record(policy: str, decision: str):
+    ADMISSION_DECISIONS.labels(policy, decision).inc()
+    with _stats_lock:
+        _decisions[(policy, decision)] = _decisions.get((policy, decision), 0) + 1
+
+
+async def _check_rate(policy: Policy, key: str):
+    try:
+        wait = await get_rate_limit_store().take(f"{policy.name}:{key}", policy.rate)
+    except Exception as e:
+        logger.warning(f"Almacén de límites no disponible, se admite la petición: {e}")
+        _record(policy.name, "store_error")
+        return
+    if wait > 0:
+        _record(policy.name, "rate_limited")
+        raise _too_many_requests(wait, "Demasiadas peticiones, inténtalo de nuevo más tarde")
+
+
+@asynccontextmanager
+async def _admit(policy: Policy, key: str):
+    if not RATE_LIMIT_ENABLED:
+        yield
+        return
+
+    await _check_rate(policy, key)
+
+    limiter = _limiters.get(policy.name)
+    if limiter is None:
+        _record(policy.name, "admitted")
+        yield
+        return
+
+    try:
+        await limiter.acquire()
+    except RateLimited as e:
+        _record(policy.name, "shed")
+        raise _too_many_requests(e.retry_after, "El servidor está ocupado, inténtalo de nuevo en unos segundos")
+    _record(policy.name, "admitted")
+    ADMISSION_IN_FLIGHT.labels(policy.name).inc()
+    try:
+        yield
+    finally:
+        ADMISSION_IN_FLIGHT.labels(policy.name).dec()
+        limiter.release()
+
+
+# --- DEPENDENCIAS PARA LAS RUTAS ---
+
+async def limit_user_route(request: Request, current_user: user_schema.User = Depends(get_current_user)):
+    """Límite general por usuario y ruta (se añade a nivel de router)."""
+    # Plantilla de la ruta ("/designs/{design_id}"), no la URL, para no tener un cubo por id
+    route = getattr(request.scope.get("route"), "path", request.url.path)
+    async with _admit(POLICIES["default"], f"{current_user.id}:{request.method} {route}"):
+        yield
+
+def admission(policy_name: str):
+    """Límite de ritmo y de concurrencia de una ruta cara, por usuario."""
+    policy = POLICIES[policy_name]
+
+    async def dependency(current_user: user_schema.User = Depends(get_current_user)):
+        async with _admit(policy, str(current_user.id)):
+            yield
+
+    return dependency
+
+async def limit_login(request: Request):
+    """Como admission() pero por IP: /token se llama sin usuario autenticado."""
+    # Detrás de un proxy, uvicorn debe ejecutarse con --proxy-headers para ver la IP real
+    client_ip = request.client.host if request.client else "unknown"
+    async with _admit(POLICIES["login"], client_ip):
+        yield
+
+
+def get_admission_stats():
+    with _stats_lock:
+        decisions = dict(_decisions)
+    stats = {}
+    for name, policy in POLICIES.items():
+        limiter = _limiters.get(name)
+        stats[name] = {
+            "rate": f"{policy.rate.capacity} cada {policy.rate.capacity / policy.rate.per_second:g}s",
+            "max_concurrent": policy.max_concurrent,
+            "active": limiter.active if limiter else None,
+            "waiting": limiter.waiting if limiter else None,
+            **{decision: count for (policy_name, decision), count in decisions.items() if policy_name == name},
+        }
+    return stats
@@ -1,19 +1,48 @@
 # app/core/security.py
 from datetime import datetime, timedelta, timezone
-from jose import JWTError, jwt
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import threading
+import time
+# python-jose (con el backend de cryptography) se importa al crear o validar
+# el primer token: es la dependencia más lenta de importar
 from passlib.context import CryptContext
 import os
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 # Importaciones nuevas para buscar al usuario
 from app.crud import user as user_crud
-from app.core.database import get_db
+from app.core.database import get_async_db
 from app.schemas import user as user_schema
+from app.models import user as user_model
+from app.core.identity_cache import identity_cache
 
-# Usamos bcrypt_sha256 para evitar el límite de 72 bytes y mayor seguridad
-pwd_context = CryptContext(schemes=["bcrypt_sha256"], deprecated="auto")
+# Usamos bcrypt_sha256 para evitar el límite de 72 bytes y mayor seguridad.
+# El coste se puede bajar en desarrollo/pruebas con BCRYPT_ROUNDS.
+pwd_context = CryptContext(
+    schemes=["bcrypt_sha256"],
+    deprecated="auto",
+    bcrypt_sha256__rounds=int(os.getenv("BCRYPT_ROUNDS", "12")),
+)
+
+# bcrypt es caro a propósito: lo ejecutamos en su propio pool de hilos para que
+# una avalancha de logins no ocupe el threadpool que usan los demás endpoints.
+# Si hay demasiadas peticiones esperando, rechazamos con 503 en lugar de encolarlas.
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "32"))
+
+_password_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+_password_lock = threading.Lock()
+_password_stats = {
+    "pending": 0,
+    "completed": 0,
+    "rejected": 0,
+    "queue_seconds_total": 0.0,
+    "queue_seconds_max": 0.0,
+    "run_seconds_total": 0.0,
+}
 
 
 SECRET_KEY = os.getenv("SECRET_KEY")
@@ -28,6 +57,52 @@ def verify_password(plain_password, hashed_password):
 def get_password_hash(password):
     return pwd_context.hash(password)
 
+async def _run_password_task(func, *args):
+    with _password_lock:
+        if _password_stats["pending"] >= PASSWORD_HASH_MAX_PENDING:
+            _password_stats["rejected"] += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Demasiadas peticiones de autenticación, inténtalo de nuevo en unos segundos",
+                headers={"Retry-After": "1"},
+            )
+        _password_stats["pending"] += 1
+
+    submitted_at = time.perf_counter()
+
+    def task():
+        started_at = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            finished_at = time.perf_counter()
+            queue_seconds = started_at - submitted_at
+            with _password_lock:
+                _password_stats["completed"] += 1
+                _password_stats["queue_seconds_total"] += queue_seconds
+                _password_stats["queue_seconds_max"] = max(_password_stats["queue_seconds_max"], queue_seconds)
+                _password_stats["run_seconds_total"] += finished_at - started_at
+
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_password_executor, task)
+    finally:
+        with _password_lock:
+            _password_stats["pending"] -= 1
+
+async def verify_password_async(plain_password, hashed_password):
+    return await _run_password_task(verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password):
+    return await _run_password_task(get_password_hash, password)
+
+def get_password_stats():
+    with _password_lock:
+        stats = dict(_password_stats)
+    stats["workers"] = PASSWORD_HASH_WORKERS
+    stats["max_pending"] = PASSWORD_HASH_MAX_PENDING
+    stats["queue_seconds_avg"] = stats["queue_seconds_total"] / stats["completed"] if stats["completed"] else 0.0
+    return stats
+
 def create_access_token(data: dict, expires_delta: timedelta | None = None):
     to_encode = data.copy()
     if expires_delta:
@@ -35,30 +110,47 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None):
     else:
         expire = datetime.now(timezone.utc) + timedelta(minutes=15)
     to_encode.update({"exp": expire})
+    from jose import jwt
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
 # --- NUEVA FUNCIÓN DE DEPENDENCIA ---
 # Esta función se encargará de todo el proceso de validación del token
-def get_current_user(db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)):
+async def get_current_user(db: AsyncSession = Depends(get_async_db), token: str = Depends(oauth2_scheme)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="No se pudieron validar las credenciales",
         headers={"WWW-Authenticate": "Bearer"},
     )
+    from jose import JWTError, jwt
     try:
         # Decodificamos el token
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         email: str = payload.get("sub")
+        user_id: int | None = payload.get("uid")
         if email is None:
             raise credentials_exception
     except JWTError:
         raise credentials_exception
+
+    # Si ya validamos este token hace poco, no volvemos a consultar la BD
+    cached_user = identity_cache.get(token)
+    if cached_user is not None:
+        return cached_user
     
-    # Buscamos al usuario en la base de datos
-    user = user_crud.get_user_by_email(db, email=email)
+    # Buscamos al usuario en la base de datos: por id (clave primaria) si el
+    # token lo trae, y por email en los tokens antiguos
+    if user_id is not None:
+        user = await user_crud.get_user_by_id_async(db, user_id)
+        if user is not None and user.email != email:
+            user = None
+    else:
+        user = await user_crud.get_user_by_email_async(db, email=email)
     if user is None:
         raise credentials_exception
     
-    # Devolvemos el objeto de usuario
-    return user
\ No newline at end of file
+    # Devolvemos (y guardamos en caché) una copia con los datos del usuario,
+    # independiente de la sesión de esta petición
+    current_user = user_schema.User.model_validate(user)
+    identity_cache.set(token, current_user, token_exp=payload.get("exp"))
+    return current_user
\ No newline at end of file
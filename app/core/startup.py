@@ -0,0 +1,119 @@
+# app/core/startup.py
+# Arranque y apagado de la app (los llama el lifespan de app.main) y estado de
+# preparación que publica /ready.
+#
+# Importar la app no toca la base de datos ni servicios externos: las
+# migraciones se aplican aquí al arrancar y, si la base de datos aún no
+# responde, se siguen reintentando en segundo plano sin impedir el arranque.
+# Mientras tanto /ready responde 503, y así el balanceador no envía tráfico.
+# Con RUN_MIGRATIONS_ON_STARTUP=false no se aplican (p. ej. si las ejecuta un
+# paso previo del despliegue con "alembic upgrade head").
+import asyncio
+import logging
+import os
+import sys
+
+from sqlalchemy import text
+
+from app.core.database import dispose_engines, get_async_engine
+
+RUN_MIGRATIONS_ON_STARTUP = os.getenv("RUN_MIGRATIONS_ON_STARTUP", "true").lower() in ("1", "true", "yes")
+MIGRATION_RETRY_MAX_BACKOFF = float(os.getenv("MIGRATION_RETRY_MAX_BACKOFF", "30"))
+READY_CHECK_TIMEOUT = float(os.getenv("READY_CHECK_TIMEOUT", "2"))
+
+logger = logging.getLogger("app.startup")
+
+_migrations_ready = False
+_migrations_error: str | None = None
+_retry_task: asyncio.Task | None = None
+
+
+async def _apply_migrations() -> bool:
+    global _migrations_ready, _migrations_error
+    # Alembic se importa solo cuando hace falta
+    from app.core.migrations import run_migrations
+
+    try:
+        await asyncio.to_thread(run_migrations)
+    except Exception as e:
+        _migrations_error = str(e)
+        return False
+    _migrations_ready = True
+    _migrations_error = None
+    return True
+
+
+async def _retry_migrations():
+    backoff = 1.0
+    while not await _apply_migrations():
+        logger.warning(f"No se pudieron aplicar las migraciones, reintento en {backoff:.0f}s: {_migrations_error}")
+        await asyncio.sleep(backoff)
+        backoff = min(backoff * 2, MIGRATION_RETRY_MAX_BACKOFF)
+    logger.info("Migraciones aplicadas")
+
+
+async def startup():
+    global _migrations_ready, _retry_task
+    if not RUN_MIGRATIONS_ON_STARTUP:
+        _migrations_ready = True
+    # Primer intento en línea: si la base de datos está disponible, la app
+    # arranca ya migrada; si no, seguimos intentándolo en segundo plano
+    elif not await _apply_migrations():
+        logger.warning(f"Base de datos no disponible al arrancar: {_migrations_error}")
+        _retry_task = asyncio.create_task(_retry_migrations())
+
+    # Cola de borrados del almacenamiento (hilo en segundo plano; si la base de
+    # datos aún no responde, lo reintenta en cada ciclo)
+    from app.services import storage_deletions
+    storage_deletions.start_worker()
+
+
+async def shutdown():
+    global _retry_task
+    if _retry_task is not None:
+        _retry_task.cancel()
+        _retry_task = None
+
+    # Esperamos a las subidas en curso para no dejar diseños en "pending"
+    from app.services import storage_deletions, uploads
+    await asyncio.to_thread(uploads.shutdown)
+    # Los borrados pendientes siguen en la BD: los procesa el próximo arranque
+    await asyncio.to_thread(storage_deletions.stop_worker)
+
+    # El pool de exportación solo existe si se llegó a importar el módulo
+    if "app.services.pdf_export" in sys.modules:
+        await asyncio.to_thread(sys.modules["app.services.pdf_export"].shutdown)
+
+    await dispose_engines()
+
+
+async def _check_database():
+    async with get_async_engine().connect() as connection:
+        await connection.execute(text("SELECT 1"))
+
+
+async def check_readiness() -> dict:
+    """Estado de cada dependencia: {"ready": bool, "checks": {nombre: "ok" | error}}."""
+    checks = {}
+
+    try:
+        await asyncio.wait_for(_check_database(), timeout=READY_CHECK_TIMEOUT)
+        checks["database"] = "ok"
+    except asyncio.TimeoutError:
+        checks["database"] = f"sin respuesta en {READY_CHECK_TIMEOUT}s"
+    except Exception as e:
+        checks["database"] = str(e)
+
+    if _migrations_ready:
+        checks["migrations"] = "ok"
+    else:
+        checks["migrations"] = _migrations_error or "pendientes"
+
+    # Solo comprobamos que el almacenamiento esté configurado: llamar al CDN en
+    # cada sondeo sería lento y lo haría responsable de caídas ajenas
+    if os.getenv("STORAGE_BACKEND", "cloudinary") == "local" or os.getenv("CLOUDINARY_CLOUD_NAME"):
+        checks["storage"] = "ok"
+    else:
+        checks["storage"] = "falta CLOUDINARY_CLOUD_NAME"
+
+    return {"ready": all(value == "ok" for value in checks.values()), "checks": checks}
@@ -1,42 +1,403 @@
 # app/crud/design.py
-from sqlalchemy.orm import Session
+# Las rutas son async: las operaciones reciben una AsyncSession (sufijo _async).
+# Las consultas se construyen aparte (abajo) para poder ver sus planes desde
+# benchmarks/query_plans.py sin ejecutarlas.
+import re
+
+from sqlalchemy import column, delete, desc, func, insert, literal, literal_column, or_, select, table, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 from app.models import design as design_model
+from app.crud import storage as storage_crud
 from app.schemas import design as design_schema
 
-def create_user_design(db: Session, design: design_schema.DesignCreate, user_id: int, screenshot_url: str):
-    # Creamos el objeto principal del diseño, incluyendo la URL de la imagen
-    db_design = design_model.Design(
-        name=design.name, 
+
+# --- CONSULTAS COMPARTIDAS ---
+
+# Cargamos los items con selectinload para no lanzar una consulta por diseño (N+1)
+# al serializar la respuesta: son siempre 2 consultas sin importar cuántos diseños haya.
+# Además, con AsyncSession no se puede hacer carga perezosa.
+def _designs_with_items():
+    return select(design_model.Design).options(selectinload(design_model.Design.items))
+
+# La paginación es por cursor (keyset) sobre Design.id: "after_id" es el último id
+# recibido por el cliente y "limit" el tamaño de página.
+def _paginate(stmt, after_id: int | None, limit: int | None):
+    if after_id is not None:
+        stmt = stmt.where(design_model.Design.id > after_id)
+    stmt = stmt.order_by(design_model.Design.id)
+    if limit is not None:
+        stmt = stmt.limit(limit)
+    return stmt
+
+def _user_designs_stmt(user_id: int, after_id: int | None, limit: int | None):
+    return _paginate(
+        _designs_with_items().where(design_model.Design.owner_id == user_id),
+        after_id,
+        limit,
+    )
+
+# Versión resumida: id, nombre, imagen y número de items, calculado en SQL
+# sin cargar los objetos DesignItem.
+def _user_design_summaries_stmt(user_id: int, after_id: int | None, limit: int | None):
+    stmt = (
+        select(
+            design_model.Design.id,
+            design_model.Design.name,
+            design_model.Design.screenshot_url,
+            design_model.Design.thumbnail_url,
+            func.count(design_model.DesignItem.id).label("item_count"),
+        )
+        .outerjoin(design_model.DesignItem, design_model.DesignItem.design_id == design_model.Design.id)
+        .where(design_model.Design.owner_id == user_id)
+        .group_by(design_model.Design.id)
+    )
+    return _paginate(stmt, after_id, limit)
+
+def _design_by_id_stmt(design_id: int, load_items: bool = True):
+    stmt = _designs_with_items() if load_items else select(design_model.Design)
+    return stmt.where(design_model.Design.id == design_id)
+
+def _designs_by_ids_stmt(design_ids: list[int]):
+    return (
+        _designs_with_items()
+        .where(design_model.Design.id.in_(design_ids))
+        .order_by(design_model.Design.id)
+    )
+
+# --- PETICIONES CONDICIONALES Y SINCRONIZACIÓN ---
+# Solo id y updated_at de la página: basta para calcular el ETag y responder
+# 304 sin cargar los diseños ni sus items.
+def _user_design_validators_stmt(user_id: int, after_id: int | None, limit: int | None):
+    return _paginate(
+        select(design_model.Design.id, design_model.Design.updated_at)
+        .where(design_model.Design.owner_id == user_id),
+        after_id,
+        limit,
+    )
+
+# Al borrar un diseño cambia el contenido del listado sin que cambie ningún
+# updated_at: la fecha del último borrado también cuenta para Last-Modified
+def _owner_last_deletion_stmt(user_id: int):
+    return (
+        select(func.max(design_model.DeletedDesign.deleted_at))
+        .where(design_model.DeletedDesign.owner_id == user_id)
+    )
+
+def _changed_designs_stmt(user_id: int, since, limit: int):
+    return (
+        _designs_with_items()
+        .where(design_model.Design.owner_id == user_id, design_model.Design.updated_at > since)
+        .order_by(design_model.Design.id)
+        .limit(limit)
+    )
+
+def _deleted_design_ids_stmt(user_id: int, since):
+    return (
+        select(design_model.DeletedDesign.design_id)
+        .where(design_model.DeletedDesign.owner_id == user_id, design_model.DeletedDesign.deleted_at > since)
+    )
+
+# Registro del borrado (en la misma transacción) y limpieza de los registros
+# del usuario más antiguos que prune_before
+def _tombstone(db_design: design_model.Design):
+    return design_model.DeletedDesign(design_id=db_design.id, owner_id=db_design.owner_id)
+
+def _prune_tombstones_stmt(user_id: int, prune_before):
+    return delete(design_model.DeletedDesign).where(
+        design_model.DeletedDesign.owner_id == user_id,
+        design_model.DeletedDesign.deleted_at < prune_before,
+    )
+
+# Dueño de cada diseño pedido, sin cargar los items (para comprobar permisos)
+def _design_owners_stmt(design_ids: list[int]):
+    return select(design_model.Design.id, design_model.Design.owner_id).where(design_model.Design.id.in_(design_ids))
+
+# Lista de materiales: cantidad total por producto sumada en SQL sobre todos
+# los diseños del usuario (o solo los indicados), sin cargar los items.
+def _materials_stmt(user_id: int, design_ids: list[int] | None):
+    stmt = (
+        select(
+            design_model.DesignItem.item_name,
+            func.sum(design_model.DesignItem.quantity).label("total_quantity"),
+            func.count(func.distinct(design_model.DesignItem.design_id)).label("design_count"),
+        )
+        .join(design_model.Design, design_model.Design.id == design_model.DesignItem.design_id)
+        .where(design_model.Design.owner_id == user_id)
+        .group_by(design_model.DesignItem.item_name)
+        .order_by(design_model.DesignItem.item_name)
+    )
+    if design_ids is not None:
+        stmt = stmt.where(design_model.DesignItem.design_id.in_(design_ids))
+    return stmt
+
+# Un solo INSERT por lotes (executemany) para todos los items, en lugar de
+# añadirlos uno por uno a la sesión.
+def _item_rows(design_items: list[tuple[int, design_schema.DesignItemBase]]):
+    return [
+        {"design_id": design_id, "item_name": item.item_name, "quantity": item.quantity}
+        for design_id, item in design_items
+    ]
+
+# --- EDICIÓN PARCIAL (PATCH) ---
+# La fila del diseño solo se actualiza si la versión sigue siendo la que leyó el
+# cliente; si otra sesión lo modificó entretanto no se toca nada (rowcount 0).
+def _design_version_update_stmt(design_id: int, changes: design_schema.DesignUpdate, screenshot_status: str | None):
+    values = {"version": design_model.Design.version + 1}
+    if changes.name is not None:
+        values["name"] = changes.name
+    if screenshot_status is not None:
+        values["screenshot_status"] = screenshot_status
+    return (
+        update(design_model.Design)
+        .where(design_model.Design.id == design_id, design_model.Design.version == changes.version)
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
+
+def _remove_items_stmt(design_id: int, item_ids: list[int]):
+    return delete(design_model.DesignItem).where(
+        design_model.DesignItem.design_id == design_id,
+        design_model.DesignItem.id.in_(item_ids),
+    )
+
+# Un UPDATE por lotes (por clave primaria) con solo los campos que cambian
+def _item_update_rows(changes: design_schema.DesignUpdate):
+    rows = [item.model_dump(exclude_none=True) for item in changes.update_items]
+    return [row for row in rows if len(row) > 1]
+
+# --- BÚSQUEDA ---
+# Los nombres de los items se copian en designs.items_text, así la búsqueda
+# consulta una sola tabla con un solo índice (FTS5 en SQLite, GIN en Postgres;
+# ver la migración 0007). Al crear o importar se calcula aquí; en el PATCH, en SQL.
+def _items_text(items) -> str:
+    return "\n".join(item.item_name for item in items)
+
+def _items_changed(changes: design_schema.DesignUpdate) -> bool:
+    return bool(changes.add_items or changes.remove_item_ids or any(item.item_name is not None for item in changes.update_items))
+
+def _items_text_update_stmt(design_id: int):
+    items_text = (
+        select(func.aggregate_strings(design_model.DesignItem.item_name, "\n"))
+        .where(design_model.DesignItem.design_id == design_id)
+        .scalar_subquery()
+    )
+    return (
+        update(design_model.Design)
+        .where(design_model.Design.id == design_id)
+        .values(items_text=items_text)
+        .execution_options(synchronize_session=False)
+    )
+
+# Palabras de la búsqueda: letras y números, en minúsculas. Cada una se busca
+# como prefijo ("ros" encuentra "rosal") y deben aparecer todas.
+SEARCH_MAX_TERMS = 8
+_SEARCH_TERM = re.compile(r"[^\W_]+")
+
+# Peso del nombre frente a los items al ordenar por relevancia (SQLite)
+SEARCH_NAME_WEIGHT = 10.0
+
+def _search_terms(query: str) -> list[str]:
+    return _SEARCH_TERM.findall(query.lower())[:SEARCH_MAX_TERMS]
+
+def _search_columns(score):
+    return select(
+        design_model.Design.id,
+        design_model.Design.name,
+        design_model.Design.screenshot_url,
+        design_model.Design.thumbnail_url,
+        score.label("score"),
+    )
+
+# SQLite: la tabla FTS5 indexa también owner_id, así el filtro por usuario se
+# resuelve dentro del índice y no sobre las coincidencias de todos los usuarios.
+# bm25() es menor cuanto más relevante: lo cambiamos de signo.
+_designs_fts = table("designs_fts", column("rowid"))
+
+def _sqlite_search_stmt(user_id: int, terms: list[str]):
+    words = " AND ".join(f'"{term}"*' for term in terms)
+    match = f'owner_id : "{user_id}" AND {{name items_text}} : ({words})'
+    score = -func.bm25(literal_column("designs_fts"), SEARCH_NAME_WEIGHT, 1.0, 0.0)
+    return (
+        _search_columns(score)
+        .join(_designs_fts, _designs_fts.c.rowid == design_model.Design.id)
+        .where(literal_column("designs_fts").op("MATCH")(match), design_model.Design.owner_id == user_id)
+    )
+
+# Postgres: tsvector ponderado (nombre A, items B) con prefijos ("ros:*"). Debe
+# ser idéntico a la expresión del índice ix_designs_search (migración 0008) o
+# no se usará. Todo pasa por immutable_unaccent(), como en los índices, para
+# ignorar los acentos igual que SQLite ("jardin" encuentra "Jardín").
+# Con 3 letras o más se buscan también subcadenas con los índices de
+# trigramas ("osal" encuentra "rosal"); la similitud suma a la relevancia.
+_PG_SEARCH_VECTOR = (
+    "setweight(to_tsvector('simple', immutable_unaccent(coalesce(designs.name, ''))), 'A') || "
+    "setweight(to_tsvector('simple', immutable_unaccent(coalesce(designs.items_text, ''))), 'B')"
+)
+
+def _postgres_search_stmt(user_id: int, terms: list[str]):
+    unaccent = func.immutable_unaccent
+    vector = literal_column(f"({_PG_SEARCH_VECTOR})")
+    query = func.to_tsquery(literal_column("'simple'"), unaccent(" & ".join(f"{term}:*" for term in terms)))
+    matches = [vector.op("@@")(query)]
+    score = func.ts_rank_cd(vector, query)
+    phrase = " ".join(terms)
+    if len(phrase) >= 3:
+        pattern = unaccent(f"%{phrase}%")
+        name, items_text = unaccent(design_model.Design.name), unaccent(design_model.Design.items_text)
+        matches += [name.ilike(pattern), items_text.ilike(pattern)]
+        score = score + func.similarity(name, unaccent(phrase))
+    return _search_columns(score).where(design_model.Design.owner_id == user_id, or_(*matches))
+
+# Otros motores: LIKE sin índice ni relevancia
+def _like_search_stmt(user_id: int, terms: list[str]):
+    return _search_columns(literal(0.0)).where(
+        design_model.Design.owner_id == user_id,
+        *(
+            or_(design_model.Design.name.ilike(f"%{term}%"), design_model.Design.items_text.ilike(f"%{term}%"))
+            for term in terms
+        ),
+    )
+
+def _search_stmt(dialect: str, user_id: int, terms: list[str], limit: int, offset: int):
+    build = {"sqlite": _sqlite_search_stmt, "postgresql": _postgres_search_stmt}.get(dialect, _like_search_stmt)
+    return (
+        build(user_id, terms)
+        .order_by(desc("score"), design_model.Design.id.desc())
+        .limit(limit)
+        .offset(offset)
+    )
+
+def _new_design(design: design_schema.DesignCreate, user_id: int, screenshot_url: str | None, screenshot_status: str):
+    return design_model.Design(
+        name=design.name,
+        items_text=_items_text(design.items),
         owner_id=user_id,
-        screenshot_url=screenshot_url # <-- Nuevo
+        screenshot_url=screenshot_url,
+        screenshot_status=screenshot_status
     )
-    db.add(db_design)
-    db.commit()
-    db.refresh(db_design)
-
-    # Añadimos los items (esto no cambia)
-    for item in design.items:
-        db_item = design_model.DesignItem(
-            item_name=item.item_name,
-            quantity=item.quantity,
-            design_id=db_design.id
+
+def _new_imported_designs(designs: list[design_schema.DesignImport], user_id: int):
+    return [
+        design_model.Design(
+            name=design.name,
+            items_text=_items_text(design.items),
+            owner_id=user_id,
+            screenshot_url=design.screenshot_url,
+            thumbnail_url=design.thumbnail_url
         )
-        db.add(db_item)
-    
-    db.commit()
-    db.refresh(db_design)
-    return db_design
+        for design in designs
+    ]
+
+def _imported_item_rows(design_ids: list[int], designs: list[design_schema.DesignImport]):
+    return _item_rows([
+        (design_id, item)
+        for design_id, design in zip(design_ids, designs)
+        for item in design.items
+    ])
+
 
-# --- NUEVA FUNCIÓN PARA OBTENER DISEÑOS ---
-def get_user_designs(db: Session, user_id: int):
-    return db.query(design_model.Design).filter(design_model.Design.owner_id == user_id).all()
+# --- OPERACIONES ---
+
+# Diseño e items en una sola transacción
+async def create_user_design_async(db: AsyncSession, design: design_schema.DesignCreate, user_id: int, screenshot_url: str | None, screenshot_status: str = "ready"):
+    db_design = _new_design(design, user_id, screenshot_url, screenshot_status)
+    db.add(db_design)
+    await db.flush()
 
-# --- NUEVA FUNCIÓN ---
-def get_design_by_id(db: Session, design_id: int):
-    return db.query(design_model.Design).filter(design_model.Design.id == design_id).first()
+    rows = _item_rows([(db_design.id, item) for item in design.items])
+    if rows:
+        await db.execute(insert(design_model.DesignItem), rows)
 
-# --- NUEVA FUNCIÓN PARA ELIMINAR ---
-def delete_design(db: Session, db_design: design_model.Design):
-    db.delete(db_design)
-    db.commit()
-    return db_design
\ No newline at end of file
+    await db.commit()
+    # Recargamos con los items (en async no se pueden cargar al acceder a ellos)
+    return (await db.scalars(
+        _design_by_id_stmt(db_design.id).execution_options(populate_existing=True)
+    )).one()
+
+# --- IMPORTACIÓN MASIVA (para migraciones) ---
+async def create_user_designs_bulk_async(db: AsyncSession, designs: list[design_schema.DesignImport], user_id: int):
+    db_designs = _new_imported_designs(designs, user_id)
+    db.add_all(db_designs)
+    await db.flush()
+
+    design_ids = [db_design.id for db_design in db_designs]
+    rows = _imported_item_rows(design_ids, designs)
+    if rows:
+        await db.execute(insert(design_model.DesignItem), rows)
+    await db.commit()
+
+    # Recargamos todo con dos consultas en vez de refrescar diseño por diseño
+    return (await db.scalars(
+        _designs_by_ids_stmt(design_ids).execution_options(populate_existing=True)
+    )).all()
+
+async def get_user_designs_async(db: AsyncSession, user_id: int, after_id: int | None = None, limit: int | None = None):
+    return (await db.scalars(_user_designs_stmt(user_id, after_id, limit))).all()
+
+async def get_user_design_summaries_async(db: AsyncSession, user_id: int, after_id: int | None = None, limit: int | None = None):
+    return (await db.execute(_user_design_summaries_stmt(user_id, after_id, limit))).all()
+
+async def get_design_by_id_async(db: AsyncSession, design_id: int, load_items: bool = True):
+    return (await db.scalars(_design_by_id_stmt(design_id, load_items))).first()
+
+# Varios diseños por id, con sus items (para la exportación en bloque)
+async def get_designs_by_ids_async(db: AsyncSession, design_ids: list[int]):
+    return (await db.scalars(_designs_by_ids_stmt(design_ids))).all()
+
+async def get_design_owners_async(db: AsyncSession, design_ids: list[int]):
+    return (await db.execute(_design_owners_stmt(design_ids))).all()
+
+async def get_user_materials_async(db: AsyncSession, user_id: int, design_ids: list[int] | None = None):
+    return (await db.execute(_materials_stmt(user_id, design_ids))).all()
+
+# Aplica el PATCH en una sola transacción. Devuelve None si la versión no coincide.
+async def update_design_async(db: AsyncSession, design_id: int, changes: design_schema.DesignUpdate, screenshot_status: str | None = None):
+    if (await db.execute(_design_version_update_stmt(design_id, changes, screenshot_status))).rowcount == 0:
+        await db.rollback()
+        return None
+
+    if changes.remove_item_ids:
+        await db.execute(_remove_items_stmt(design_id, changes.remove_item_ids))
+    update_rows = _item_update_rows(changes)
+    if update_rows:
+        await db.execute(update(design_model.DesignItem), update_rows)
+    add_rows = _item_rows([(design_id, item) for item in changes.add_items])
+    if add_rows:
+        await db.execute(insert(design_model.DesignItem), add_rows)
+    if _items_changed(changes):
+        await db.execute(_items_text_update_stmt(design_id))
+    await db.commit()
+
+    return (await db.scalars(
+        _design_by_id_stmt(design_id).execution_options(populate_existing=True)
+    )).one()
+
+# Diseños del usuario que coinciden con la búsqueda, de más a menos relevante
+async def search_user_designs_async(db: AsyncSession, user_id: int, query: str, limit: int, offset: int = 0):
+    terms = _search_terms(query)
+    if not terms:
+        return []
+    return (await db.execute(_search_stmt(db.get_bind().dialect.name, user_id, terms, limit, offset))).all()
+
+async def get_user_design_validators_async(db: AsyncSession, user_id: int, after_id: int | None = None, limit: int | None = None):
+    return (await db.execute(_user_design_validators_stmt(user_id, after_id, limit))).all()
+
+async def get_owner_last_deletion_async(db: AsyncSession, user_id: int):
+    return await db.scalar(_owner_last_deletion_stmt(user_id))
+
+async def get_changed_designs_async(db: AsyncSession, user_id: int, since, limit: int):
+    return (await db.scalars(_changed_designs_stmt(user_id, since, limit))).all()
+
+async def get_deleted_design_ids_async(db: AsyncSession, user_id: int, since):
+    return (await db.scalars(_deleted_design_ids_stmt(user_id, since))).all()
+
+# Las imágenes no se borran aquí: quedan en la cola de borrados (misma transacción)
+async def delete_design_async(db: AsyncSession, db_design: design_model.Design, prune_before=None):
+    await db.delete(db_design)
+    storage_crud.queue_deletions(db, [db_design.screenshot_url, db_design.thumbnail_url])
+    db.add(_tombstone(db_design))
+    if prune_before is not None:
+        await db.execute(_prune_tombstones_stmt(db_design.owner_id, prune_before))
+    await db.commit()
+    return db_design
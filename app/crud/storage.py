@@ -0,0 +1,55 @@
+# app/crud/storage.py
+# Cola (outbox) de borrados del almacenamiento. queue_deletions() sirve con
+# Session y con AsyncSession: solo añade filas, se guardan con el commit del
+# que la llama.
+from sqlalchemy import func, select, union
+from sqlalchemy.orm import Session
+
+from app.models import design as design_model
+from app.models import storage as storage_model
+
+
+def queue_deletions(db, urls):
+    db.add_all([storage_model.StorageDeletion(url=url) for url in urls if url])
+
+
+# Lote de borrados pendientes. Las filas se reservan hasta lease_until
+# (next_attempt_at) y la transacción la cierra quien llama: el bloqueo (y SKIP
+# LOCKED en Postgres) solo dura lo que tarda ese commit, no la llamada al CDN.
+def claim_due_deletions(db: Session, now, limit: int, lease_until):
+    rows = db.scalars(
+        select(storage_model.StorageDeletion)
+        .where(storage_model.StorageDeletion.next_attempt_at <= now)
+        .order_by(storage_model.StorageDeletion.next_attempt_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    ).all()
+    for row in rows:
+        row.next_attempt_at = lease_until
+    return rows
+
+def get_deletions(db: Session, ids):
+    return db.scalars(
+        select(storage_model.StorageDeletion).where(storage_model.StorageDeletion.id.in_(ids))
+    ).all()
+
+# URLs de la lista que algún diseño sigue usando (otro diseño puede apuntar al
+# mismo archivo, p. ej. importado con la URL de uno existente)
+def get_urls_in_use(db: Session, urls):
+    return set(db.scalars(union(
+        select(design_model.Design.screenshot_url).where(design_model.Design.screenshot_url.in_(urls)),
+        select(design_model.Design.thumbnail_url).where(design_model.Design.thumbnail_url.in_(urls)),
+    )))
+
+def count_pending_deletions(db: Session):
+    return db.scalar(select(func.count(storage_model.StorageDeletion.id)))
+
+# Todas las URLs que siguen en uso o ya están en la cola (para la reconciliación)
+def iter_known_urls(db: Session):
+    for screenshot_url, thumbnail_url in db.execute(
+        select(design_model.Design.screenshot_url, design_model.Design.thumbnail_url)
+        .execution_options(yield_per=1000)
+    ):
+        yield screenshot_url
+        yield thumbnail_url
+    yield from db.scalars(select(storage_model.StorageDeletion.url).execution_options(yield_per=1000))
@@ -1,24 +1,18 @@
 # app/crud/user.py
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.models import user as user_model
 from app.schemas import user as user_schema
-from app.core.security import get_password_hash, verify_password
 
-def get_user_by_email(db: Session, email: str):
-    return db.query(user_model.User).filter(user_model.User.email == email).first()
+async def get_user_by_email_async(db: AsyncSession, email: str):
+    return (await db.scalars(select(user_model.User).where(user_model.User.email == email))).first()
 
-def create_user(db: Session, user: user_schema.UserCreate):
-    hashed_password = get_password_hash(user.password)
+async def get_user_by_id_async(db: AsyncSession, user_id: int):
+    return await db.get(user_model.User, user_id)
+
+# El hash se calcula fuera (en el pool de contraseñas) para no bloquear el event loop
+async def create_user_async(db: AsyncSession, user: user_schema.UserCreate, hashed_password: str):
     db_user = user_model.User(email=user.email, hashed_password=hashed_password)
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
     return db_user
-
-def authenticate_user(db: Session, email: str, password: str):
-    user = get_user_by_email(db, email=email)
-    if not user:
-        return None
-    if not verify_password(password, user.hashed_password):
-        return None
-    return user
\ No newline at end of file
@@ -1,18 +1,26 @@
 # app/main.py
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.core.database import engine
-from app.models import user as user_model, design as design_model
-from app.routers import users, auth, designs
+from app.core import startup
+from app.core.metrics import MetricsMiddleware
+from app.routers import users, auth, designs, metrics, health
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Importar la app no tiene efectos: las migraciones se aplican aquí y al
+    # apagar se cierran los pools (ver app/core/startup.py)
+    await startup.startup()
+    yield
+    await startup.shutdown()
 
-# Esta línea crea las tablas en tu base de datos (si no existen)
-user_model.Base.metadata.create_all(bind=engine)
-design_model.Base.metadata.create_all(bind=engine)
 
 app = FastAPI(
     title="Jardín AR API",
     description="API para la aplicación de diseño de jardines en Realidad Aumentada.",
     version="0.1.0",
+    lifespan=lifespan,
 )
 
 # --- INICIO DE LA CONFIGURACIÓN DE CORS ---
@@ -33,11 +41,16 @@ app.add_middleware(
 
 # --- FIN DE LA CONFIGURACIÓN DE CORS ---
 
+# Métricas por petición (latencia, tamaño, consultas SQL), publicadas en /metrics
+app.add_middleware(MetricsMiddleware)
+
 
 # Incluimos todos los routers
 app.include_router(users.router)
 app.include_router(auth.router)
 app.include_router(designs.router)
+app.include_router(metrics.router)
+app.include_router(health.router)
 
 @app.get("/")
 def leer_raiz():
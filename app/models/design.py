@@ -1,23 +1,63 @@
 # app/models/design.py
-from sqlalchemy import Column, Integer, String, ForeignKey
+from datetime import datetime, timezone
+from sqlalchemy import Column, DateTime, Integer, String, ForeignKey, Index, func
 from sqlalchemy.orm import relationship
 from app.core.database import Base
 
+# La hora la pone la app (con microsegundos y en UTC) en todos los motores;
+# el server_default solo sirve para las filas que ya existían al migrar
+def _utcnow():
+    return datetime.now(timezone.utc)
+
 class Design(Base):
     __tablename__ = "designs"
 
-    id = Column(Integer, primary_key=True, index=True)
-    name = Column(String, index=True)
+    id = Column(Integer, primary_key=True)
+    name = Column(String)
     screenshot_url = Column(String) # Aquí guardaremos la ruta a la foto
+    thumbnail_url = Column(String) # Miniatura para la galería
+    screenshot_status = Column(String, nullable=False, default="ready", server_default="ready") # pending / ready / failed
     owner_id = Column(Integer, ForeignKey("users.id"))
+    version = Column(Integer, nullable=False, default=1, server_default="1") # Concurrencia optimista en PATCH
+    updated_at = Column(DateTime(timezone=True), nullable=False, default=_utcnow, onupdate=_utcnow, server_default=func.now())
+    # Nombres de los items separados por saltos de línea, para la búsqueda
+    # (lo mantiene app/crud/design.py; ver la migración 0007)
+    items_text = Column(String)
 
     owner = relationship("User")
-    items = relationship("DesignItem", cascade="all, delete-orphan")
+    # passive_deletes: los items los borra la BD (ON DELETE CASCADE) sin cargarlos.
+    # Orden fijo: el PDF y su clave de caché/ETag dependen del orden de los items
+    items = relationship("DesignItem", cascade="all, delete-orphan", passive_deletes=True, order_by="DesignItem.id")
+
+    # Todas las consultas filtran por usuario y ordenan/paginan por id
+    __table_args__ = (
+        Index("ix_designs_owner_id_id", "owner_id", "id"),
+        # Sincronización incremental: cambios de un usuario desde una fecha
+        Index("ix_designs_owner_id_updated_at", "owner_id", "updated_at"),
+        # La cola de borrados comprueba que ningún diseño siga usando la imagen
+        Index("ix_designs_screenshot_url", "screenshot_url"),
+        Index("ix_designs_thumbnail_url", "thumbnail_url"),
+    )
 
 class DesignItem(Base):
     __tablename__ = "design_items"
 
-    id = Column(Integer, primary_key=True, index=True)
-    item_name = Column(String, index=True)
+    id = Column(Integer, primary_key=True)
+    item_name = Column(String)
     quantity = Column(Integer)
-    design_id = Column(Integer, ForeignKey("designs.id"))
\ No newline at end of file
+    updated_at = Column(DateTime(timezone=True), nullable=False, default=_utcnow, onupdate=_utcnow, server_default=func.now())
+    design_id = Column(Integer, ForeignKey("designs.id", ondelete="CASCADE"), index=True)
+
+# Registro de los diseños eliminados, para que los clientes que sincronizan
+# con ?since= sepan qué borrar. Se guardan SYNC_TOMBSTONE_DAYS días.
+class DeletedDesign(Base):
+    __tablename__ = "deleted_designs"
+
+    id = Column(Integer, primary_key=True)
+    design_id = Column(Integer, nullable=False)
+    owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    deleted_at = Column(DateTime(timezone=True), nullable=False, default=_utcnow)
+
+    __table_args__ = (
+        Index("ix_deleted_designs_owner_id_deleted_at", "owner_id", "deleted_at"),
+    )
@@ -0,0 +1,24 @@
+from datetime import datetime, timezone
+from sqlalchemy import Column, DateTime, Integer, String, Index
+from app.core.database import Base
+
+def _utcnow():
+    return datetime.now(timezone.utc)
+
+# "Outbox" de borrados del almacenamiento: se escribe en la misma transacción
+# que elimina o reemplaza la imagen y un proceso en segundo plano la vacía
+# (app/services/storage_deletions.py). Así ningún borrado se pierde aunque el
+# CDN falle o la app se reinicie.
+class StorageDeletion(Base):
+    __tablename__ = "storage_deletions"
+
+    id = Column(Integer, primary_key=True)
+    url = Column(String, nullable=False)
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    next_attempt_at = Column(DateTime(timezone=True), nullable=False, default=_utcnow)
+    last_error = Column(String)
+    created_at = Column(DateTime(timezone=True), nullable=False, default=_utcnow)
+
+    __table_args__ = (
+        Index("ix_storage_deletions_next_attempt_at", "next_attempt_at"),
+    )
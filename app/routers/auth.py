@@ -1,22 +1,30 @@
 # app/routers/auth.py
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import timedelta
 import os
 
 from app.schemas.token import Token # Crearemos este schema nuevo
 from app.core import security # Crearemos este módulo nuevo
-from app.core.database import get_db # Modificaremos database.py para esto
+from app.core.rate_limit import limit_login
+from app.core.database import get_async_db # Modificaremos database.py para esto
 from app.crud import user as user_crud # Crearemos este módulo nuevo
 
 router = APIRouter(tags=["authentication"])
 
 
-@router.post("/token", response_model=Token)
-def login_for_access_token(db: Session = Depends(get_db), form_data: OAuth2PasswordRequestForm = Depends()):
-    # 1. Autenticar al usuario (verificar email y contraseña)
-    user = user_crud.authenticate_user(db, email=form_data.username, password=form_data.password)
+# Límite por IP: cada intento de login cuesta un bcrypt
+@router.post("/token", response_model=Token, dependencies=[Depends(limit_login)])
+async def login_for_access_token(db: AsyncSession = Depends(get_async_db), form_data: OAuth2PasswordRequestForm = Depends()):
+    # 1. Autenticar al usuario (verificar email y contraseña).
+    # La consulta es asíncrona y bcrypt va a su propio pool de hilos.
+    user = await user_crud.get_user_by_email_async(db, email=form_data.username)
+    # Devolvemos la conexión al pool antes del bcrypt: si no, una avalancha de
+    # logins acapara el pool mientras espera turno y bloquea las demás rutas
+    await db.close()
+    if user and not await security.verify_password_async(form_data.password, user.hashed_password):
+        user = None
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -27,9 +35,9 @@ def login_for_access_token(db: Session = Depends(get_db), form_data: OAuth2Passw
     # 2. Definir cuánto durará el token
     access_token_expires = timedelta(minutes=int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES")))
 
-    # 3. Crear el token de acceso
+    # 3. Crear el token de acceso (con el id para no tener que buscar por email)
     access_token = security.create_access_token(
-        data={"sub": user.email}, expires_delta=access_token_expires
+        data={"sub": user.email, "uid": user.id}, expires_delta=access_token_expires
     )
 
     # 4. Devolver el token
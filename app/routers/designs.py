@@ -1,34 +1,88 @@
 # app/routers/designs.py
-from fastapi import APIRouter, Depends, UploadFile, File, Form, HTTPException, status, Response
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, UploadFile, File, Form, HTTPException, status, Response, Query, Header
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
+from pydantic import ValidationError
+import csv
+import hashlib
+import io
 import json
-import cloudinary
-import cloudinary.uploader
-from typing import List # Importante para la nueva ruta GET
+import os
+from datetime import datetime, timedelta, timezone
+from typing import List, Literal # Importante para la nueva ruta GET
 
-# Importamos la configuración para que se ejecute al iniciar
-from app.core import config
 from app.schemas import design as design_schema
 from app.crud import design as design_crud
-from app.core.database import get_db
+from app.core.database import get_async_db
 from app.core.security import get_current_user
+from app.core.rate_limit import admission, limit_user_route
+from app.core.http_cache import as_utc, cache_headers, etag_matches, is_not_modified
 from app.models import user as user_model
 
 from fastapi.responses import StreamingResponse
-from app.services import pdf_generator
-from io import BytesIO
+# pdf_generator y pdf_export (fpdf2, PIL, requests) y storage_deletions se
+# importan dentro de las rutas que los usan, para que arrancar la app no los cargue
+from app.services import pdf_cache, uploads
+from app.services.storage import get_storage
 import re # Para limpiar el nombre del archivo
 
 router = APIRouter(
     prefix="/designs",
     tags=["designs"],
+    # Límite de peticiones por usuario y ruta (ver app/core/rate_limit.py)
+    dependencies=[Depends(limit_user_route)],
 )
 
-@router.post("/", response_model=design_schema.Design)
-def create_design(
+# Tamaño de página por defecto y máximo para los listados
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# Máximo de diseños por exportación o lista de materiales
+MAX_EXPORT_DESIGNS = design_schema.MAX_EXPORT_DESIGNS
+
+# Sincronización incremental (GET /designs/changes):
+# - los borrados se recuerdan SYNC_TOMBSTONE_DAYS días; un cliente que lleva más
+#   tiempo sin sincronizar recibe full_resync
+# - la ventana empieza SYNC_OVERLAP_SECONDS antes de "since", para no perder
+#   cambios de transacciones que tardaron en confirmarse (el cliente puede
+#   recibir de nuevo algún cambio que ya tenía)
+# - con más de MAX_SYNC_CHANGES cambios sale más a cuenta descargar el listado
+SYNC_TOMBSTONE_DAYS = int(os.getenv("SYNC_TOMBSTONE_DAYS", "30"))
+SYNC_OVERLAP_SECONDS = float(os.getenv("SYNC_OVERLAP_SECONDS", "5"))
+MAX_SYNC_CHANGES = 500
+
+# Búsqueda: paginación por desplazamiento (el orden es por relevancia, no por
+# id); más allá de MAX_SEARCH_OFFSET resultados conviene afinar la búsqueda
+MAX_SEARCH_OFFSET = 1000
+
+
+def _set_next_cursor(response: Response, rows, limit: int):
+    # Si la página vino llena puede haber más: devolvemos el cursor en una cabecera
+    # para no cambiar el formato (lista) de la respuesta.
+    if len(rows) == limit:
+        response.headers["X-Next-Cursor"] = str(rows[-1].id)
+
+
+# El contenido de un diseño solo cambia si cambia su updated_at
+def _design_etag(design) -> str:
+    return f'"d{design.id}-{as_utc(design.updated_at).timestamp():.6f}"'
+
+# ETag de una página del listado: ids y updated_at de sus filas
+def _list_etag(rows, after_id: int | None, limit: int) -> str:
+    content = f"{after_id}:{limit}:" + ",".join(f"{row.id}@{as_utc(row.updated_at).timestamp():.6f}" for row in rows)
+    return f'"{hashlib.sha256(content.encode()).hexdigest()[:32]}"'
+
+def _list_last_modified(rows, last_deletion):
+    dates = [as_utc(row.updated_at) for row in rows]
+    if last_deletion is not None:
+        dates.append(as_utc(last_deletion))
+    return max(dates, default=None)
+
+@router.post("/", response_model=design_schema.Design, dependencies=[Depends(admission("upload"))])
+async def create_design(
     design_data: str = Form(...),
     screenshot_file: UploadFile = File(...),
-    db: Session = Depends(get_db), 
+    db: AsyncSession = Depends(get_async_db), 
     current_user: user_model.User = Depends(get_current_user)
 ):
     try:
@@ -36,45 +90,301 @@ def create_design(
     except json.JSONDecodeError:
         raise HTTPException(status_code=400, detail="El formato del JSON de design_data es inválido.")
 
-    # 1. Subimos la imagen a Cloudinary
-    try:
-        upload_result = cloudinary.uploader.upload(screenshot_file.file)
-        screenshot_url = upload_result.get("secure_url")
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error al subir la imagen a Cloudinary: {e}")
+    # 1. Leemos la imagen ahora: el archivo temporal se cierra al terminar la petición.
+    # Antes comprobamos que haya sitio en la cola de subidas (si no, 503)
+    uploads.ensure_capacity()
+    screenshot_data = await screenshot_file.read()
 
-    # 2. Creamos el diseño en la BD (ahora pasamos también la URL de la imagen)
-    db_design = design_crud.create_user_design(
+    # 2. Creamos el diseño en la BD con la imagen pendiente de subir
+    db_design = await design_crud.create_user_design_async(
         db=db, 
         design=design_create, 
         user_id=current_user.id, 
-        screenshot_url=screenshot_url
+        screenshot_url=None,
+        screenshot_status=uploads.SCREENSHOT_PENDING
     )
+
+    # 3. La subida al almacenamiento se hace en segundo plano; la URL se escribe al terminar
+    uploads.enqueue_screenshot_upload(db_design.id, screenshot_data)
     
     return db_design
 
 
+# --- EDICIÓN PARCIAL DE UN DISEÑO ---
+@router.patch("/{design_id}", response_model=design_schema.Design, dependencies=[Depends(admission("upload"))])
+async def update_design(
+    design_id: int,
+    design_data: str = Form(...),
+    screenshot_file: UploadFile | None = File(None),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: user_model.User = Depends(get_current_user)
+):
+    """
+    Aplica cambios a un diseño sin recrearlo: nombre, items añadidos, modificados
+    o quitados y, opcionalmente, una nueva imagen (que se sube en segundo plano).
+    design_data debe incluir la "version" leída; si no coincide devuelve 409.
+    """
+    try:
+        changes = design_schema.DesignUpdate.model_validate_json(design_data)
+    except ValidationError:
+        raise HTTPException(status_code=400, detail="El formato del JSON de design_data es inválido.")
+
+    # 1. Buscamos el diseño y verificamos que pertenezca al usuario
+    db_design = await design_crud.get_design_by_id_async(db=db, design_id=design_id)
+    if not db_design:
+        raise HTTPException(status_code=404, detail="Diseño no encontrado")
+    if db_design.owner_id != current_user.id:
+        raise HTTPException(status_code=403, detail="No tienes permiso para modificar este diseño")
+
+    # 2. Comprobamos la versión y que los items referenciados sean de este diseño
+    if db_design.version != changes.version:
+        raise HTTPException(status_code=409, detail="El diseño fue modificado desde otra sesión. Vuelve a cargarlo.")
+    referenced_ids = [item.id for item in changes.update_items] + changes.remove_item_ids
+    if len(referenced_ids) != len(set(referenced_ids)):
+        raise HTTPException(status_code=400, detail="Cada item solo puede aparecer una vez en los cambios.")
+    if not set(referenced_ids) <= {item.id for item in db_design.items}:
+        raise HTTPException(status_code=404, detail="Item no encontrado en el diseño")
+
+    # 3. Si hay nueva imagen, la leemos ahora (no se admite otra mientras se sube la anterior)
+    screenshot_data = None
+    if screenshot_file is not None:
+        if db_design.screenshot_status == uploads.SCREENSHOT_PENDING:
+            raise HTTPException(status_code=409, detail="La imagen anterior todavía se está subiendo.")
+        uploads.ensure_capacity()
+        screenshot_data = await screenshot_file.read()
+
+    # 4. Aplicamos todos los cambios en una sola transacción
+    updated_design = await design_crud.update_design_async(
+        db=db,
+        design_id=design_id,
+        changes=changes,
+        screenshot_status=uploads.SCREENSHOT_PENDING if screenshot_data is not None else None
+    )
+    if updated_design is None:
+        raise HTTPException(status_code=409, detail="El diseño fue modificado desde otra sesión. Vuelve a cargarlo.")
+
+    # 5. La imagen nueva se sube en segundo plano; la anterior se borra al terminar
+    if screenshot_data is not None:
+        uploads.enqueue_screenshot_upload(design_id, screenshot_data)
+
+    return updated_design
+
+
+# --- IMPORTACIÓN MASIVA DE DISEÑOS ---
+MAX_IMPORT_DESIGNS = 500
+
+@router.post("/import", response_model=List[design_schema.Design], status_code=status.HTTP_201_CREATED)
+async def import_designs(
+    designs: List[design_schema.DesignImport],
+    db: AsyncSession = Depends(get_async_db),
+    current_user: user_model.User = Depends(get_current_user)
+):
+    """
+    Crea varios diseños (con sus items) en una sola transacción.
+    Pensado para trabajos de migración: las imágenes deben estar ya subidas.
+    """
+    if len(designs) > MAX_IMPORT_DESIGNS:
+        raise HTTPException(status_code=400, detail=f"Se pueden importar como máximo {MAX_IMPORT_DESIGNS} diseños por petición.")
+    # Las imágenes tienen que ser de nuestro almacenamiento: el PDF las descarga
+    # (no puede pedir cualquier host) y al borrar el diseño se eliminan
+    storage = get_storage()
+    for design in designs:
+        for url in (design.screenshot_url, design.thumbnail_url):
+            if url and not storage.owns(url):
+                raise HTTPException(status_code=400, detail=f"La imagen {url} no es de nuestro almacenamiento.")
+    return await design_crud.create_user_designs_bulk_async(db=db, designs=designs, user_id=current_user.id)
+
+
 # --- NUEVA RUTA PARA LEER LOS DISEÑOS ---
 @router.get("/", response_model=List[design_schema.Design])
-def read_user_designs(
-    db: Session = Depends(get_db),
+async def read_user_designs(
+    response: Response,
+    after_id: int | None = Query(None, description="Cursor: id del último diseño recibido"),
+    limit: int | None = Query(None, ge=1, le=MAX_PAGE_SIZE, description=f"Tamaño de página (por defecto {DEFAULT_PAGE_SIZE} si se pasa after_id)"),
+    if_none_match: str | None = Header(None),
+    if_modified_since: str | None = Header(None),
+    db: AsyncSession = Depends(get_async_db),
     current_user: user_model.User = Depends(get_current_user)
 ):
     """
-    Obtiene una lista de todos los diseños creados por el usuario actual.
+    Obtiene una página de los diseños creados por el usuario actual.
+    Si hay más resultados, la cabecera X-Next-Cursor trae el valor para "after_id".
+    Sin limit ni after_id devuelve todos, como antes de paginar (las versiones
+    de Unity que no siguen X-Next-Cursor perderían el resto).
+    Admite If-None-Match / If-Modified-Since: si la página no cambió responde 304.
     """
-    designs = design_crud.get_user_designs(db=db, user_id=current_user.id)
+    if limit is None and after_id is not None:
+        limit = DEFAULT_PAGE_SIZE
+    last_deletion = await design_crud.get_owner_last_deletion_async(db=db, user_id=current_user.id)
+
+    # Petición condicional: comprobamos primero con solo id y updated_at,
+    # sin cargar los diseños ni sus items
+    if if_none_match or if_modified_since:
+        validators = await design_crud.get_user_design_validators_async(db=db, user_id=current_user.id, after_id=after_id, limit=limit)
+        etag = _list_etag(validators, after_id, limit)
+        last_modified = _list_last_modified(validators, last_deletion)
+        if is_not_modified(if_none_match, if_modified_since, etag, last_modified):
+            not_modified = Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=cache_headers(etag, last_modified))
+            _set_next_cursor(not_modified, validators, limit)
+            return not_modified
+
+    designs = await design_crud.get_user_designs_async(db=db, user_id=current_user.id, after_id=after_id, limit=limit)
+    _set_next_cursor(response, designs, limit)
+    response.headers.update(cache_headers(_list_etag(designs, after_id, limit), _list_last_modified(designs, last_deletion)))
     return designs
 
+# --- SINCRONIZACIÓN INCREMENTAL ---
+@router.get("/changes", response_model=design_schema.DesignChanges)
+async def read_design_changes(
+    since: datetime = Query(..., description="next_since de la sincronización anterior"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: user_model.User = Depends(get_current_user)
+):
+    """
+    Diseños creados o modificados y ids de los eliminados desde "since".
+    La respuesta trae "next_since" para la próxima llamada.
+    """
+    now = datetime.now(timezone.utc)
+    since = as_utc(since)
+    if since < now - timedelta(days=SYNC_TOMBSTONE_DAYS):
+        return design_schema.DesignChanges(changed=[], deleted_ids=[], next_since=now, full_resync=True)
+
+    window_start = since - timedelta(seconds=SYNC_OVERLAP_SECONDS)
+    changed = await design_crud.get_changed_designs_async(db=db, user_id=current_user.id, since=window_start, limit=MAX_SYNC_CHANGES + 1)
+    if len(changed) > MAX_SYNC_CHANGES:
+        return design_schema.DesignChanges(changed=[], deleted_ids=[], next_since=now, full_resync=True)
+
+    # Un id borrado que vuelve a existir (SQLite puede reutilizarlos) no se informa como borrado
+    deleted_ids = await design_crud.get_deleted_design_ids_async(db=db, user_id=current_user.id, since=window_start)
+    changed_ids = {design.id for design in changed}
+    return design_schema.DesignChanges(
+        changed=changed,
+        deleted_ids=sorted(set(deleted_ids) - changed_ids),
+        next_since=now,
+    )
+
+# --- RUTA RESUMIDA PARA LA GALERÍA ---
+@router.get("/summary", response_model=List[design_schema.DesignSummary])
+async def read_user_design_summaries(
+    response: Response,
+    after_id: int | None = Query(None, description="Cursor: id del último diseño recibido"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: user_model.User = Depends(get_current_user)
+):
+    """
+    Igual que el listado pero solo con id, nombre, imagen y número de items.
+    """
+    summaries = await design_crud.get_user_design_summaries_async(db=db, user_id=current_user.id, after_id=after_id, limit=limit)
+    _set_next_cursor(response, summaries, limit)
+    return summaries
+
+# --- BÚSQUEDA POR NOMBRE DEL DISEÑO O DE SUS ITEMS ---
+@router.get("/search", response_model=List[design_schema.DesignSearchHit])
+async def search_designs(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200, description="Palabras a buscar (cada una como prefijo)"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    offset: int = Query(0, ge=0, le=MAX_SEARCH_OFFSET),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: user_model.User = Depends(get_current_user)
+):
+    """
+    Diseños del usuario cuyo nombre o items contienen todas las palabras de "q"
+    ("ros" encuentra "rosal"), de más a menos relevante; el nombre pesa más que los items.
+    Si hay más resultados, la cabecera X-Next-Offset trae el valor para "offset".
+    """
+    hits = await design_crud.search_user_designs_async(db=db, user_id=current_user.id, query=q, limit=limit, offset=offset)
+    if len(hits) == limit and offset + limit <= MAX_SEARCH_OFFSET:
+        response.headers["X-Next-Offset"] = str(offset + limit)
+    return hits
+
+# --- LISTA DE MATERIALES (TOTAL POR PRODUCTO) ---
+@router.get("/materials", response_model=List[design_schema.MaterialTotal])
+async def read_materials(
+    design_ids: List[int] | None = Query(None, description="Diseños a incluir (por defecto, todos los del usuario)"),
+    format: Literal["json", "csv", "pdf"] = Query("json"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: user_model.User = Depends(get_current_user)
+):
+    """
+    Cantidad total de cada producto sumando los diseños indicados (o todos).
+    Se calcula en la base de datos, sin enviar las listas de items al cliente.
+    """
+    # 1. Mismas verificaciones que en la exportación, sin cargar los items
+    if design_ids is not None:
+        design_ids = list(dict.fromkeys(design_ids))
+        if len(design_ids) > MAX_EXPORT_DESIGNS:
+            raise HTTPException(status_code=400, detail=f"Se pueden incluir como máximo {MAX_EXPORT_DESIGNS} diseños por petición.")
+        owners = await design_crud.get_design_owners_async(db=db, design_ids=design_ids)
+        if len(owners) != len(design_ids):
+            raise HTTPException(status_code=404, detail="Diseño no encontrado")
+        if any(owner.owner_id != current_user.id for owner in owners):
+            raise HTTPException(status_code=403, detail="No tienes permiso para acceder a este diseño")
+
+    # 2. Sumamos en SQL (GROUP BY item_name)
+    rows = await design_crud.get_user_materials_async(db=db, user_id=current_user.id, design_ids=design_ids)
+    materials = [design_schema.MaterialTotal.model_validate(row) for row in rows]
+
+    # 3. Devolvemos JSON, CSV o PDF
+    if format == "csv":
+        output = io.StringIO()
+        writer = csv.writer(output)
+        writer.writerow(["item_name", "total_quantity", "design_count"])
+        writer.writerows((material.item_name, material.total_quantity, material.design_count) for material in materials)
+        return Response(
+            content=output.getvalue(),
+            media_type="text/csv; charset=utf-8",
+            headers={"Content-Disposition": "attachment; filename=materiales.csv"}
+        )
+
+    if format == "pdf":
+        from app.services import pdf_generator
+
+        pdf_bytes = bytes(await run_in_threadpool(pdf_generator.generate_materials_pdf, materials))
+        return Response(
+            content=pdf_bytes,
+            media_type="application/pdf",
+            headers={"Content-Disposition": "attachment; filename=materiales.pdf"}
+        )
+
+    return materials
+
+# --- UN DISEÑO ---
+@router.get("/{design_id}", response_model=design_schema.Design)
+async def read_design(
+    design_id: int,
+    response: Response,
+    if_none_match: str | None = Header(None),
+    if_modified_since: str | None = Header(None),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: user_model.User = Depends(get_current_user)
+):
+    """
+    Un diseño con sus items. Admite If-None-Match / If-Modified-Since (304).
+    """
+    db_design = await design_crud.get_design_by_id_async(db=db, design_id=design_id)
+    if not db_design:
+        raise HTTPException(status_code=404, detail="Diseño no encontrado")
+    if db_design.owner_id != current_user.id:
+        raise HTTPException(status_code=403, detail="No tienes permiso para acceder a este diseño")
+
+    headers = cache_headers(_design_etag(db_design), db_design.updated_at)
+    if is_not_modified(if_none_match, if_modified_since, headers["ETag"], db_design.updated_at):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+    return db_design
+
 # --- ENDPOINT CORREGIDO PARA GENERAR EL PDF CON EL NOMBRE DEL DISEÑO ---
-@router.get("/{design_id}/pdf", tags=["designs"])
-def download_design_pdf(
+@router.get("/{design_id}/pdf", tags=["designs"], dependencies=[Depends(admission("pdf"))])
+async def download_design_pdf(
     design_id: int,
-    db: Session = Depends(get_db),
+    if_none_match: str | None = Header(None),
+    db: AsyncSession = Depends(get_async_db),
     current_user: user_model.User = Depends(get_current_user)
 ):
     # 1. Buscamos el diseño en la base de datos
-    db_design = design_crud.get_design_by_id(db=db, design_id=design_id)
+    db_design = await design_crud.get_design_by_id_async(db=db, design_id=design_id)
 
     # 2. Verificaciones de seguridad
     if not db_design:
@@ -82,30 +392,102 @@ def download_design_pdf(
     if db_design.owner_id != current_user.id:
         raise HTTPException(status_code=403, detail="No tienes permiso para acceder a este diseño")
 
-    # 3. Llamamos a nuestro servicio para generar el PDF
-    pdf_bytes = pdf_generator.generate_design_pdf(db_design)
+    # 3. Si el cliente ya tiene esta versión del PDF, no hace falta enviarla otra vez
+    cache_key = pdf_cache.design_pdf_key(db_design)
+    etag = f'"{cache_key}"'
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+    # 4. Buscamos el PDF en la caché y solo lo generamos si no está
+    cache = pdf_cache.get_pdf_cache()
+    pdf_bytes = cache.get(cache_key)
+    validator_headers = {"ETag": etag}
+    if pdf_bytes is None:
+        from app.services import pdf_generator
+
+        # fpdf2 gasta CPU: lo ejecutamos fuera del event loop
+        pdf_bytes, complete = await run_in_threadpool(pdf_generator.generate_design_pdf, db_design)
+        pdf_bytes = bytes(pdf_bytes)
+        if complete:
+            cache.set(cache_key, pdf_bytes)
+        else:
+            # Falló la descarga de la imagen: el PDF lleva un aviso en su lugar.
+            # Ni caché ni ETag, para que la próxima petición lo vuelva a intentar
+            validator_headers = {"Cache-Control": "no-store"}
 
     # --- INICIO DE LA CORRECIÓN ---
     # Limpiamos el nombre del diseño para que sea un nombre de archivo válido.
     # Reemplazamos espacios y cualquier caracter no seguro con un guion bajo.
     clean_filename = re.sub(r'[^\w\._-]', '_', db_design.name)
     
-    # 4. Devolvemos el PDF como un archivo para descargar con el nombre correcto
-    return StreamingResponse(
-        BytesIO(pdf_bytes),
+    # 5. Devolvemos el PDF como un archivo para descargar con el nombre correcto.
+    # Se envían los mismos bytes de la caché, sin copiarlos a otro buffer,
+    # y así la respuesta lleva su Content-Length.
+    return Response(
+        content=pdf_bytes,
         media_type="application/pdf",
-        headers={"Content-Disposition": f"attachment; filename={clean_filename}.pdf"}
+        headers={
+            "Content-Disposition": f"attachment; filename={clean_filename}.pdf",
+            **validator_headers,
+        }
     )
     
+# --- EXPORTACIÓN DE VARIOS DISEÑOS (UN PDF O UN ZIP) ---
+
+@router.post("/export", dependencies=[Depends(admission("pdf"))])
+async def export_designs(
+    export_request: design_schema.DesignExportRequest,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: user_model.User = Depends(get_current_user)
+):
+    """
+    Exporta varios diseños (o todos los del usuario si no se indican ids),
+    como un único PDF o como un ZIP con un PDF por diseño.
+    """
+    # 1. Buscamos los diseños y aplicamos las mismas verificaciones que en la descarga individual.
+    # La lista de ids ya viene limitada (el schema la valida); sin ids, pedimos uno
+    # más del máximo para saber si se pasa sin cargar todos los diseños con sus items
+    if export_request.design_ids is None:
+        db_designs = await design_crud.get_user_designs_async(db=db, user_id=current_user.id, limit=MAX_EXPORT_DESIGNS + 1)
+        if len(db_designs) > MAX_EXPORT_DESIGNS:
+            raise HTTPException(status_code=400, detail=f"Se pueden exportar como máximo {MAX_EXPORT_DESIGNS} diseños por petición.")
+    else:
+        design_ids = list(dict.fromkeys(export_request.design_ids))
+        db_designs = await design_crud.get_designs_by_ids_async(db=db, design_ids=design_ids)
+        if len(db_designs) != len(design_ids):
+            raise HTTPException(status_code=404, detail="Diseño no encontrado")
+        if any(db_design.owner_id != current_user.id for db_design in db_designs):
+            raise HTTPException(status_code=403, detail="No tienes permiso para acceder a este diseño")
+
+    # 2. Copiamos los datos a schemas: se envían a otros procesos y no dependen de la sesión
+    designs = [design_schema.Design.model_validate(db_design, from_attributes=True) for db_design in db_designs]
+
+    # 3. Generamos el resultado
+    from app.services import pdf_export
+
+    if export_request.format == "pdf":
+        pdf_bytes = await run_in_threadpool(pdf_export.render_merged_pdf, designs)
+        return Response(
+            content=pdf_bytes,
+            media_type="application/pdf",
+            headers={"Content-Disposition": "attachment; filename=disenos.pdf"}
+        )
+
+    return StreamingResponse(
+        pdf_export.stream_zip(designs),
+        media_type="application/zip",
+        headers={"Content-Disposition": "attachment; filename=disenos.zip"}
+    )
+
     # --- NUEVO ENDPOINT PARA ELIMINAR UN DISEÑO ---
 @router.delete("/{design_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_design_endpoint(
+async def delete_design_endpoint(
     design_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: user_model.User = Depends(get_current_user)
 ):
     # 1. Buscamos el diseño en la base de datos
-    db_design = design_crud.get_design_by_id(db=db, design_id=design_id)
+    db_design = await design_crud.get_design_by_id_async(db=db, design_id=design_id, load_items=False)
 
     # 2. Verificamos si existe y si pertenece al usuario actual (seguridad)
     if not db_design:
@@ -114,20 +496,18 @@ def delete_design_endpoint(
     if db_design.owner_id != current_user.id:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="No tienes permiso para eliminar este diseño")
 
-    # 3. (Opcional pero recomendado) Eliminar la imagen de Cloudinary
-    if db_design.screenshot_url:
-        try:
-            # Extraemos el 'public_id' de la URL de Cloudinary para decirle cuál borrar
-            public_id_with_extension = db_design.screenshot_url.split('/')[-1]
-            public_id = public_id_with_extension.rsplit('.', 1)[0]
-            cloudinary.uploader.destroy(public_id)
-        except Exception as e:
-            # Si falla la eliminación en Cloudinary, solo lo registramos en la consola.
-            # No detenemos la eliminación del diseño de nuestra base de datos.
-            print(f"Advertencia: No se pudo eliminar la imagen de Cloudinary: {e}")
-
-    # 4. Eliminamos el diseño de nuestra base de datos usando la función del CRUD
-    design_crud.delete_design(db=db, db_design=db_design)
+    # 3. Eliminamos el diseño de nuestra base de datos usando la función del CRUD
+    # (los items los borra la propia BD con ON DELETE CASCADE). En la misma
+    # transacción quedan registrados el borrado, para la sincronización
+    # incremental, y la imagen y su miniatura en la cola de borrados: el CDN
+    # se llama en segundo plano y no retrasa la respuesta.
+    await design_crud.delete_design_async(
+        db=db,
+        db_design=db_design,
+        prune_before=datetime.now(timezone.utc) - timedelta(days=SYNC_TOMBSTONE_DAYS)
+    )
+    from app.services import storage_deletions
+    storage_deletions.wake()
 
     # Devolvemos una respuesta vacía (204), que es el estándar para una eliminación exitosa
     return Response(status_code=status.HTTP_204_NO_CONTENT)
\ No newline at end of file
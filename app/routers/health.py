@@ -0,0 +1,23 @@
+# app/routers/health.py
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+
+from app.core.startup import check_readiness
+
+router = APIRouter(tags=["health"])
+
+@router.get("/health")
+def read_health():
+    """
+    Liveness: el proceso está vivo y atiende peticiones. No consulta dependencias.
+    """
+    return {"status": "ok"}
+
+@router.get("/ready")
+async def read_readiness():
+    """
+    Readiness: la base de datos responde, las migraciones están aplicadas y el
+    almacenamiento está configurado. Devuelve 503 mientras no sea así.
+    """
+    readiness = await check_readiness()
+    return JSONResponse(content=readiness, status_code=200 if readiness["ready"] else 503)
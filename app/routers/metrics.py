@@ -0,0 +1,94 @@
+# app/routers/metrics.py
+# Las métricas exponen detalles internos (pools, colas, rutas) y algunas hacen
+# consultas a la BD: solo responden con "Authorization: Bearer <METRICS_TOKEN>".
+# Sin METRICS_TOKEN configurado, /metrics no está disponible (404).
+import os
+import secrets
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Response, status
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+
+from app.core.db_metrics import get_pool_stats
+from app.core.security import get_password_stats
+
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+
+def require_metrics_token(authorization: str | None = Header(None)):
+    if not METRICS_TOKEN:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not secrets.compare_digest(token.encode(), METRICS_TOKEN.encode()):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token de métricas no válido",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+
+router = APIRouter(
+    prefix="/metrics",
+    tags=["metrics"],
+    dependencies=[Depends(require_metrics_token)],
+)
+
+@router.get("")
+def read_prometheus_metrics():
+    """
+    Todas las métricas en formato Prometheus.
+    """
+    return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+@router.get("/images")
+def read_image_fetch_metrics():
+    """
+    Latencia de descarga de imágenes y aciertos de la caché de imágenes decodificadas.
+    """
+    from app.services.image_fetcher import get_image_fetcher
+
+    return get_image_fetcher().get_stats()
+
+
+@router.get("/passwords")
+def read_password_hash_metrics():
+    """
+    Carga del pool de hashing de contraseñas: pendientes, rechazadas y tiempo en cola.
+    """
+    return get_password_stats()
+
+
+@router.get("/db-pool")
+def read_db_pool_metrics():
+    """
+    Estado de los pools de conexiones (síncrono y asíncrono): conexiones en uso,
+    overflow, invalidaciones y tiempo de espera para obtener una conexión.
+    """
+    return get_pool_stats()
+
+
+@router.get("/storage-deletions")
+def read_storage_deletion_metrics():
+    """
+    Cola de borrados del almacenamiento: archivos borrados, intentos fallidos y pendientes.
+    """
+    from app.core.database import SessionLocal
+    from app.crud import storage as storage_crud
+    from app.services import storage_deletions
+
+    db = SessionLocal()
+    try:
+        pending = storage_crud.count_pending_deletions(db)
+    finally:
+        db.close()
+    return {**storage_deletions.get_stats(), "pending": pending}
+
+
+@router.get("/admission")
+def read_admission_metrics():
+    """
+    Control de admisión por política: límites, peticiones en curso y en cola,
+    y cuántas se admitieron o rechazaron (rate_limited, shed).
+    """
+    from app.core.rate_limit import get_admission_stats
+
+    return get_admission_stats()
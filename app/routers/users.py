@@ -1,10 +1,11 @@
 # app/routers/users.py
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.schemas import user as user_schema
 from app.crud import user as user_crud
-from app.core.database import get_db
-from app.core.security import get_current_user # <-- Importamos la nueva función
+from app.core.database import get_async_db
+from app.core.security import get_current_user, get_password_hash_async # <-- Importamos la nueva función
+from app.core.rate_limit import limit_login, limit_user_route
 from app.models import user as user_model # <-- Importamos el modelo para el tipo de dato
 
 router = APIRouter(
@@ -12,17 +13,22 @@ router = APIRouter(
     tags=["users"],
 )
 
-@router.post("/", response_model=user_schema.User)
-def create_user(user: user_schema.UserCreate, db: Session = Depends(get_db)):
-    db_user = user_crud.get_user_by_email(db, email=user.email)
+# El alta también calcula un bcrypt: mismo límite por IP que /token
+@router.post("/", response_model=user_schema.User, dependencies=[Depends(limit_login)])
+async def create_user(user: user_schema.UserCreate, db: AsyncSession = Depends(get_async_db)):
+    db_user = await user_crud.get_user_by_email_async(db, email=user.email)
     if db_user:
         raise HTTPException(status_code=400, detail="El correo electrónico ya está registrado")
-    return user_crud.create_user(db=db, user=user)
+    # El hash se calcula en el pool de contraseñas, no en el threadpool general,
+    # y sin retener la conexión (se vuelve a pedir para guardar el usuario)
+    await db.close()
+    hashed_password = await get_password_hash_async(user.password)
+    return await user_crud.create_user_async(db=db, user=user, hashed_password=hashed_password)
 
 
 # --- NUEVA RUTA PROTEGIDA ---
-@router.get("/me/", response_model=user_schema.User)
-def read_users_me(current_user: user_model.User = Depends(get_current_user)):
+@router.get("/me/", response_model=user_schema.User, dependencies=[Depends(limit_user_route)])
+async def read_users_me(current_user: user_model.User = Depends(get_current_user)):
     """
     Obtiene el perfil del usuario actual.
     Esta ruta está protegida y requiere autenticación.
@@ -1,22 +1,116 @@
 # app/schemas/design.py
-from pydantic import BaseModel
-from typing import List
+from datetime import datetime, timezone
+from pydantic import BaseModel, Field, field_validator
+from typing import List, Literal
 
 # Cómo se ve un item individual dentro de un diseño
 class DesignItemBase(BaseModel):
     item_name: str
     quantity: int
 
+# Item ya guardado: el id sirve para modificarlo o quitarlo con PATCH
+class DesignItem(DesignItemBase):
+    id: int
+
+    class Config:
+        from_attributes = True
+
 # Qué datos necesitamos para crear un diseño (esto es lo que Unity enviará)
 class DesignCreate(BaseModel):
     name: str
     items: List[DesignItemBase]
 
+# Diseño ya existente que se importa en bloque (la imagen ya está subida)
+class DesignImport(DesignCreate):
+    screenshot_url: str | None = None
+    thumbnail_url: str | None = None
+
 # Cómo se verá un diseño completo cuando lo devolvamos desde la API
 class Design(DesignCreate):
     id: int
     owner_id: int
+    items: List[DesignItem]
+    version: int = 1
+    updated_at: datetime | None = None
+    screenshot_url: str | None = None
+    thumbnail_url: str | None = None
+    screenshot_status: str = "ready"
+
+    # SQLite devuelve las fechas sin zona horaria: siempre están en UTC
+    @field_validator("updated_at")
+    @classmethod
+    def _updated_at_utc(cls, value):
+        if value is not None and value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value
+
+    class Config:
+        from_attributes = True
+
+# Versión ligera para la galería de Unity (sin la lista de items)
+class DesignSummary(BaseModel):
+    id: int
+    name: str
+    screenshot_url: str | None = None
+    thumbnail_url: str | None = None
+    item_count: int
+
+    class Config:
+        from_attributes = True
+
+
+# Resultado de la búsqueda: como el resumen, con la relevancia (mayor = mejor)
+class DesignSearchHit(BaseModel):
+    id: int
+    name: str
     screenshot_url: str | None = None
+    thumbnail_url: str | None = None
+    score: float
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+
+# Respuesta de la sincronización incremental (?since=). Si full_resync es true
+# el cliente debe volver a descargar el listado completo.
+class DesignChanges(BaseModel):
+    changed: List[Design]
+    deleted_ids: List[int]
+    next_since: datetime
+    full_resync: bool = False
+
+
+# Cambio en un item existente: solo se modifican los campos enviados
+class DesignItemUpdate(BaseModel):
+    id: int
+    item_name: str | None = None
+    quantity: int | None = None
+
+# Edición parcial de un diseño (PATCH). "version" es la que tenía el diseño
+# cuando el cliente lo leyó: si otra sesión lo cambió entretanto, se rechaza.
+class DesignUpdate(BaseModel):
+    version: int
+    name: str | None = None
+    add_items: List[DesignItemBase] = []
+    update_items: List[DesignItemUpdate] = []
+    remove_item_ids: List[int] = []
+
+
+# Total de un producto en la lista de materiales
+class MaterialTotal(BaseModel):
+    item_name: str
+    total_quantity: int
+    design_count: int
+
+    class Config:
+        from_attributes = True
+
+
+# Máximo de diseños por exportación o lista de materiales
+MAX_EXPORT_DESIGNS = 500
+
+# Petición de exportación en bloque: sin ids se exportan todos los diseños del usuario.
+# El límite se valida aquí, antes de llegar a la consulta IN (...)
+class DesignExportRequest(BaseModel):
+    design_ids: List[int] | None = Field(None, max_length=MAX_EXPORT_DESIGNS)
+    format: Literal["zip", "pdf"] = "zip"
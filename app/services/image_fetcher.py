@@ -0,0 +1,133 @@
+# app/services/image_fetcher.py
+# Descarga de imágenes remotas (las capturas guardadas en el CDN) para el PDF.
+# Usa una sesión HTTP compartida con pool de conexiones, timeouts y un límite
+# de tamaño, y guarda en un LRU pequeño las últimas imágenes descargadas.
+# Se guardan los bytes comprimidos tal cual: ocupan mucho menos que la imagen
+# decodificada y el PDF puede incrustar el JPEG sin volver a codificarlo.
+import os
+import threading
+import time
+from collections import OrderedDict
+from io import BytesIO
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from app.core.metrics import observe_external
+
+IMAGE_FETCH_CONNECT_TIMEOUT = float(os.getenv("IMAGE_FETCH_CONNECT_TIMEOUT", "3"))
+IMAGE_FETCH_READ_TIMEOUT = float(os.getenv("IMAGE_FETCH_READ_TIMEOUT", "10"))
+IMAGE_FETCH_MAX_BYTES = int(os.getenv("IMAGE_FETCH_MAX_BYTES", str(15 * 1024 * 1024)))
+IMAGE_FETCH_POOL_SIZE = int(os.getenv("IMAGE_FETCH_POOL_SIZE", "10"))
+IMAGE_CACHE_SIZE = int(os.getenv("IMAGE_CACHE_SIZE", "32"))
+
+_CHUNK_SIZE = 64 * 1024
+
+
+class ImageTooLarge(Exception):
+    pass
+
+
+class ImageFetcher:
+    def __init__(
+        self,
+        connect_timeout: float = IMAGE_FETCH_CONNECT_TIMEOUT,
+        read_timeout: float = IMAGE_FETCH_READ_TIMEOUT,
+        max_bytes: int = IMAGE_FETCH_MAX_BYTES,
+        pool_size: int = IMAGE_FETCH_POOL_SIZE,
+        cache_size: int = IMAGE_CACHE_SIZE,
+    ):
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_bytes = max_bytes
+        self.cache_size = cache_size
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._cache: OrderedDict[str, bytes] = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {
+            "fetches": 0,
+            "errors": 0,
+            "cache_hits": 0,
+            "cache_misses": 0,
+            "bytes_fetched": 0,
+            "fetch_seconds_total": 0.0,
+            "fetch_seconds_max": 0.0,
+        }
+
+    def _download(self, url: str) -> bytes:
+        with observe_external("screenshot_cdn", "fetch"), \
+                self.session.get(url, timeout=self.timeout, stream=True) as response:
+            response.raise_for_status()
+            content_length = response.headers.get("Content-Length")
+            if content_length and int(content_length) > self.max_bytes:
+                raise ImageTooLarge(f"La imagen ocupa {content_length} bytes (máximo {self.max_bytes})")
+
+            # Leemos por bloques y cortamos si el servidor manda más de lo permitido
+            buffer = BytesIO()
+            for chunk in response.iter_content(_CHUNK_SIZE):
+                buffer.write(chunk)
+                if buffer.tell() > self.max_bytes:
+                    raise ImageTooLarge(f"La imagen supera el máximo de {self.max_bytes} bytes")
+            return buffer.getvalue()
+
+    def fetch_bytes(self, url: str) -> bytes:
+        """Devuelve el contenido de la imagen tal cual lo sirve el CDN."""
+        with self._lock:
+            data = self._cache.get(url)
+            if data is not None:
+                self._cache.move_to_end(url)
+                self._stats["cache_hits"] += 1
+                return data
+            self._stats["cache_misses"] += 1
+
+        start = time.perf_counter()
+        try:
+            data = self._download(url)
+        except Exception:
+            with self._lock:
+                self._stats["errors"] += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self._stats["fetches"] += 1
+                self._stats["fetch_seconds_total"] += elapsed
+                self._stats["fetch_seconds_max"] = max(self._stats["fetch_seconds_max"], elapsed)
+
+        with self._lock:
+            self._stats["bytes_fetched"] += len(data)
+            if self.cache_size > 0:
+                self._cache[url] = data
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return data
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["cache_entries"] = len(self._cache)
+        lookups = stats["cache_hits"] + stats["cache_misses"]
+        stats["cache_hit_rate"] = stats["cache_hits"] / lookups if lookups else 0.0
+        stats["fetch_seconds_avg"] = stats["fetch_seconds_total"] / stats["fetches"] if stats["fetches"] else 0.0
+        return stats
+
+
+_fetcher: ImageFetcher | None = None
+_fetcher_lock = threading.Lock()
+
+def get_image_fetcher() -> ImageFetcher:
+    global _fetcher
+    if _fetcher is None:
+        with _fetcher_lock:
+            if _fetcher is None:
+                _fetcher = ImageFetcher()
+    return _fetcher
+
+def set_image_fetcher(fetcher: ImageFetcher) -> None:
+    """Permite sustituir el cliente (por ejemplo, apuntando a un servidor HTTP local en pruebas)."""
+    global _fetcher
+    _fetcher = fetcher
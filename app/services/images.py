@@ -0,0 +1,47 @@
+# app/services/images.py
+# Normalización de las capturas que envía Unity: se hace una sola vez al
+# recibirlas (en el pool de subidas) para no volver a procesarlas en cada PDF.
+import os
+from io import BytesIO
+
+from PIL import Image, ImageOps
+
+SCREENSHOT_MAX_SIZE = int(os.getenv("SCREENSHOT_MAX_SIZE", "1920"))
+SCREENSHOT_QUALITY = int(os.getenv("SCREENSHOT_QUALITY", "85"))
+THUMBNAIL_SIZE = int(os.getenv("THUMBNAIL_SIZE", "320"))
+THUMBNAIL_QUALITY = int(os.getenv("THUMBNAIL_QUALITY", "75"))
+
+
+def _to_rgb(img: Image.Image) -> Image.Image:
+    # JPEG/WebP sin transparencia: aplanamos el canal alfa sobre fondo blanco
+    if img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info):
+        img = img.convert("RGBA")
+        background = Image.new("RGB", img.size, (255, 255, 255))
+        background.paste(img, mask=img.getchannel("A"))
+        return background
+    return img.convert("RGB")
+
+
+def _encode(img: Image.Image, format: str, quality: int) -> bytes:
+    with BytesIO() as buffer:
+        # Al guardar sin pasar exif/icc_profile los metadatos se descartan
+        img.save(buffer, format=format, quality=quality, optimize=True)
+        return buffer.getvalue()
+
+
+def normalize_screenshot(data: bytes) -> tuple[bytes, bytes]:
+    """
+    Devuelve (imagen, miniatura): la imagen en JPEG con el lado mayor limitado
+    a SCREENSHOT_MAX_SIZE y una miniatura WebP de THUMBNAIL_SIZE px.
+    """
+    with Image.open(BytesIO(data)) as img:
+        # Respetamos la orientación EXIF antes de descartar los metadatos
+        img = _to_rgb(ImageOps.exif_transpose(img))
+
+    img.thumbnail((SCREENSHOT_MAX_SIZE, SCREENSHOT_MAX_SIZE), Image.LANCZOS)
+    screenshot = _encode(img, "JPEG", SCREENSHOT_QUALITY)
+
+    img.thumbnail((THUMBNAIL_SIZE, THUMBNAIL_SIZE), Image.LANCZOS)
+    thumbnail = _encode(img, "WEBP", THUMBNAIL_QUALITY)
+
+    return screenshot, thumbnail
@@ -0,0 +1,111 @@
+# app/services/pdf_cache.py
+# Caché de PDFs generados. La clave es un hash del contenido que aparece en el
+# PDF (nombre, items e imagen), así que cuando el diseño cambia la clave cambia
+# sola y no hace falta invalidar nada. La clave se usa también como ETag.
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+from app.models import design as design_model
+
+# Subir este número si cambia la plantilla del PDF, para descartar lo cacheado
+# (2: descarta los PDFs cacheados con el aviso "Error al cargar la imagen")
+PDF_TEMPLATE_VERSION = 2
+
+
+def design_pdf_key(design: design_model.Design) -> str:
+    content = {
+        "v": PDF_TEMPLATE_VERSION,
+        "name": design.name,
+        "items": [[item.item_name, item.quantity] for item in design.items],
+        "screenshot_url": design.screenshot_url,
+    }
+    return hashlib.sha256(json.dumps(content, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+class PDFCache:
+    def get(self, key: str) -> bytes | None:
+        raise NotImplementedError
+
+    def set(self, key: str, data: bytes) -> None:
+        raise NotImplementedError
+
+
+class NullPDFCache(PDFCache):
+    def get(self, key: str) -> bytes | None:
+        return None
+
+    def set(self, key: str, data: bytes) -> None:
+        pass
+
+
+class MemoryPDFCache(PDFCache):
+    """LRU en memoria limitado por el total de bytes guardados."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self._entries: OrderedDict[str, bytes] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> bytes | None:
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+            return data
+
+    def set(self, key: str, data: bytes) -> None:
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.current_bytes -= len(old)
+            self._entries[key] = data
+            self.current_bytes += len(data)
+            while self.current_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.current_bytes -= len(evicted)
+
+
+class DiskPDFCache(PDFCache):
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def get(self, key: str) -> bytes | None:
+        try:
+            return (self.directory / f"{key}.pdf").read_bytes()
+        except FileNotFoundError:
+            return None
+
+    def set(self, key: str, data: bytes) -> None:
+        # Escribimos en un temporal y renombramos para no servir PDFs a medias
+        path = self.directory / f"{key}.pdf"
+        tmp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, path)
+
+
+_pdf_cache: PDFCache | None = None
+
+def get_pdf_cache() -> PDFCache:
+    global _pdf_cache
+    if _pdf_cache is None:
+        backend = os.getenv("PDF_CACHE_BACKEND", "memory")
+        if backend == "disk":
+            _pdf_cache = DiskPDFCache(os.getenv("PDF_CACHE_DIR", "pdf_cache"))
+        elif backend == "none":
+            _pdf_cache = NullPDFCache()
+        else:
+            _pdf_cache = MemoryPDFCache(int(os.getenv("PDF_CACHE_MAX_BYTES", str(64 * 1024 * 1024))))
+    return _pdf_cache
+
+def set_pdf_cache(cache: PDFCache) -> None:
+    """Permite sustituir la caché (por ejemplo, en pruebas)."""
+    global _pdf_cache
+    _pdf_cache = cache
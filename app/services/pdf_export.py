@@ -0,0 +1,119 @@
+# app/services/pdf_export.py
+# Exportación de muchos diseños a la vez. fpdf2 y PIL gastan CPU, así que los
+# PDFs se generan en un pool de procesos. El ZIP se va enviando a medida que
+# cada PDF está listo, con un número acotado de PDFs en vuelo, para que la
+# memoria no crezca con la cantidad de diseños.
+import io
+import multiprocessing
+import os
+import re
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Iterator
+
+from app.schemas import design as design_schema
+from app.services import pdf_cache, pdf_generator
+
+PDF_EXPORT_WORKERS = int(os.getenv("PDF_EXPORT_WORKERS", str(os.cpu_count() or 2)))
+
+_executor: ProcessPoolExecutor | None = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                # "spawn" para no heredar los hilos (pool de subidas, conexiones) del proceso web
+                _executor = ProcessPoolExecutor(
+                    max_workers=PDF_EXPORT_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+    return _executor
+
+
+def shutdown():
+    """Cierra el pool de procesos, si se llegó a crear."""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=True, cancel_futures=True)
+            _executor = None
+
+
+def _render_design(design: design_schema.Design) -> tuple[bytes, bool]:
+    data, complete = pdf_generator.generate_design_pdf(design)
+    return bytes(data), complete
+
+
+def _render_designs(designs: list[design_schema.Design]) -> bytes:
+    return bytes(pdf_generator.generate_designs_pdf(designs))
+
+
+def pdf_filename(design: design_schema.Design) -> str:
+    # Mismo criterio que la descarga individual, con el id para evitar nombres repetidos
+    clean_name = re.sub(r'[^\w\._-]', '_', design.name)
+    return f"{design.id}_{clean_name}.pdf"
+
+
+def render_merged_pdf(designs: list[design_schema.Design]) -> bytes:
+    """Un único PDF con todos los diseños, generado fuera del proceso web."""
+    return get_executor().submit(_render_designs, designs).result()
+
+
+def _render_all(designs: list[design_schema.Design]) -> Iterator[tuple[design_schema.Design, bytes]]:
+    # Reutilizamos la caché de PDFs individuales y solo mandamos al pool los que faltan.
+    # Como mucho hay 2 PDFs por proceso pendientes de enviar.
+    cache = pdf_cache.get_pdf_cache()
+    window = PDF_EXPORT_WORKERS * 2
+    pending = []
+    for design in designs:
+        key = pdf_cache.design_pdf_key(design)
+        cached = cache.get(key)
+        future = None if cached is not None else get_executor().submit(_render_design, design)
+        pending.append((design, key, cached, future))
+        while len(pending) >= window:
+            yield _collect(cache, *pending.pop(0))
+    for entry in pending:
+        yield _collect(cache, *entry)
+
+
+def _collect(cache, design, key, cached, future):
+    if cached is not None:
+        return design, cached
+    data, complete = future.result()
+    # Si la imagen no se pudo cargar, el PDF va al ZIP pero no a la caché
+    if complete:
+        cache.set(key, data)
+    return design, data
+
+
+class _ZipChunks(io.RawIOBase):
+    # Destino no "seekable" para zipfile: guarda lo escrito hasta que lo recogemos
+    def __init__(self):
+        self._chunks: list[bytes] = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def take(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def stream_zip(designs: list[design_schema.Design]) -> Iterable[bytes]:
+    """Genera el ZIP por trozos: un trozo por cada PDF añadido."""
+    output = _ZipChunks()
+    # Los PDFs ya vienen comprimidos: ZIP_STORED evita gastar CPU en balde
+    with zipfile.ZipFile(output, mode="w", compression=zipfile.ZIP_STORED) as archive:
+        for design, data in _render_all(designs):
+            archive.writestr(pdf_filename(design), data)
+            yield output.take()
+    yield output.take()
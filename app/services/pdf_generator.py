@@ -1,10 +1,10 @@
 from fpdf import FPDF
-import requests
 from io import BytesIO
 from PIL import Image
 from datetime import datetime
 
 from app.models import design as design_model
+from app.services.image_fetcher import get_image_fetcher
 
 # --- NUEVA PALETA DE COLORES MÁS VIVOS ---
 COLOR_PRIMARY = (46, 139, 87)    # Un verde mar más vivo
@@ -26,8 +26,68 @@ class PDF(FPDF):
         self.set_text_color(*COLOR_GRAY)
         self.cell(0, 10, f'Página {self.page_no()}', 0, 0, 'C')
 
+# Devuelve (pdf, complete): complete es False si no se pudo cargar la imagen.
+# Ese PDF lleva un aviso de error en su lugar y no debe cachearse.
 def generate_design_pdf(design: design_model.Design):
     pdf = PDF()
+    complete = _add_design_pages(pdf, design)
+    return pdf.output(), complete
+
+# --- VARIOS DISEÑOS EN UN SOLO DOCUMENTO ---
+def generate_designs_pdf(designs: list[design_model.Design]):
+    pdf = PDF()
+    for design in designs:
+        _add_design_pages(pdf, design)
+    return pdf.output()
+
+# --- LISTA DE MATERIALES (TOTAL POR PRODUCTO) ---
+# Recibe filas con item_name, total_quantity y design_count
+def generate_materials_pdf(materials):
+    pdf = PDF()
+    pdf.add_page()
+
+    pdf.set_font('Helvetica', 'B', 22)
+    pdf.set_text_color(*COLOR_PRIMARY)
+    pdf.cell(0, 12, 'Lista de Materiales', 0, 1, 'L')
+
+    pdf.set_font('Helvetica', '', 10)
+    pdf.set_text_color(*COLOR_GRAY)
+    pdf.cell(0, 8, f'Generado el: {datetime.now().strftime("%d de %B de %Y a las %H:%M")}', 0, 1, 'L')
+    pdf.ln(10)
+
+    pdf.set_font('Helvetica', 'B', 12)
+    pdf.set_fill_color(*COLOR_PRIMARY)
+    pdf.set_text_color(255, 255, 255)
+
+    col_width_qty = 35
+    col_width_designs = 35
+    col_width_name = pdf.w - pdf.l_margin - pdf.r_margin - col_width_qty - col_width_designs
+
+    pdf.cell(col_width_name, 10, 'Producto', 1, 0, 'C', fill=True)
+    pdf.cell(col_width_qty, 10, 'Cantidad', 1, 0, 'C', fill=True)
+    pdf.cell(col_width_designs, 10, 'Diseños', 1, 1, 'C', fill=True)
+
+    pdf.set_font('Helvetica', '', 11)
+    pdf.set_text_color(*COLOR_TEXT)
+    fill_row = False
+    for material in materials:
+        if fill_row:
+            pdf.set_fill_color(*COLOR_SECONDARY)
+        else:
+            pdf.set_fill_color(255, 255, 255)
+
+        pdf.cell(col_width_name, 10, f'  {material.item_name}', 1, 0, 'L', fill=True)
+        pdf.cell(col_width_qty, 10, str(material.total_quantity), 1, 0, 'C', fill=True)
+        pdf.cell(col_width_designs, 10, str(material.design_count), 1, 1, 'C', fill=True)
+        fill_row = not fill_row
+
+    return pdf.output()
+
+# Añade al documento las páginas de un diseño (tabla de items e imagen).
+# Solo usa name, items y screenshot_url, así que sirve igual con el modelo
+# de la BD que con el schema (que es lo que se envía a otros procesos).
+# Devuelve False si el diseño tiene imagen y no se pudo incrustar.
+def _add_design_pages(pdf: PDF, design: design_model.Design):
     pdf.add_page()
     
     # --- Bloque de Título del Diseño ---
@@ -82,14 +142,14 @@ def generate_design_pdf(design: design_model.Design):
         pdf.ln(5)
 
         try:
-            response = requests.get(design.screenshot_url)
-            response.raise_for_status() 
-            
-            img = Image.open(BytesIO(response.content))
+            image_data = get_image_fetcher().fetch_bytes(design.screenshot_url)
+
+            # Solo leemos la cabecera para conocer el tamaño: no se decodifica la imagen
+            with Image.open(BytesIO(image_data)) as img:
+                img_width, img_height = img.size
             
             page_width = pdf.w - pdf.l_margin - pdf.r_margin
             page_height = pdf.h - pdf.t_margin - pdf.b_margin - 30 
-            img_width, img_height = img.size
             aspect_ratio = float(img_width) / float(img_height)
             final_width = page_width
             final_height = final_width / aspect_ratio
@@ -99,16 +159,14 @@ def generate_design_pdf(design: design_model.Design):
             x_centered = pdf.l_margin + (page_width - final_width) / 2
             y_centered = pdf.t_margin + 25 + (page_height - final_height) / 2
             
-            with BytesIO() as image_buffer:
-                img_format = img.format if img.format in ['JPEG', 'PNG', 'GIF'] else 'PNG'
-                img.save(image_buffer, format=img_format)
-                image_buffer.seek(0)
-                pdf.image(image_buffer, x=x_centered, y=y_centered, w=final_width, h=final_height, type=img_format)
+            # fpdf2 incrusta los JPEG tal cual (sin recodificar); el resto lo convierte él
+            pdf.image(BytesIO(image_data), x=x_centered, y=y_centered, w=final_width, h=final_height)
+            return True
 
         except Exception as e:
             pdf.ln(10)
             pdf.set_font('Arial', 'I', 10)
             pdf.set_text_color(255, 0, 0)
             pdf.cell(0, 10, f"Error al cargar la imagen: {e}", 0, 1, 'C')
-
-    return pdf.output()
\ No newline at end of file
+            return False
+    return True
\ No newline at end of file
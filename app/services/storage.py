@@ -0,0 +1,181 @@
+# app/services/storage.py
+# Backends de almacenamiento para las imágenes de los diseños.
+# En producción usamos Cloudinary; para pruebas sin red hay un backend local
+# que guarda los archivos en una carpeta. Se elige con STORAGE_BACKEND.
+import os
+import re
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterator
+from urllib.parse import urlparse
+
+from app.core.config import configure_cloudinary
+from app.core.metrics import observe_external
+
+# Carpeta de la cuenta de Cloudinary donde van las imágenes de la app. La
+# reconciliación solo recorre esta carpeta: el resto de la cuenta no es nuestro
+CLOUDINARY_FOLDER = os.getenv("CLOUDINARY_FOLDER", "mi-jardin").strip("/")
+
+
+class StorageBackend:
+    def upload(self, data: bytes, filename: str | None = None) -> str:
+        """Sube el archivo y devuelve su URL pública."""
+        raise NotImplementedError
+
+    def delete(self, url: str) -> None:
+        """Elimina el archivo a partir de la URL devuelta por upload()."""
+        raise NotImplementedError
+
+    def delete_many(self, urls: list[str]) -> dict[str, str]:
+        """Elimina varios archivos. Devuelve los errores por URL (vacío si todo fue bien)."""
+        errors = {}
+        for url in urls:
+            try:
+                self.delete(url)
+            except Exception as e:
+                errors[url] = str(e)
+        return errors
+
+    def iter_files(self) -> Iterator[tuple[str, datetime]]:
+        """Recorre todos los archivos guardados: (URL, fecha de creación)."""
+        raise NotImplementedError
+
+    def key(self, url: str) -> str:
+        """Identificador del archivo, para comparar URLs que apuntan al mismo."""
+        return url
+
+    def owns(self, url: str) -> bool:
+        """Indica si la URL es de un archivo de este almacenamiento (las que
+        llegan de fuera, p. ej. en la importación, no pueden apuntar a otro sitio)."""
+        raise NotImplementedError
+
+
+class CloudinaryStorage(StorageBackend):
+    # La Admin API admite hasta 100 public_ids por llamada a delete_resources
+    DELETE_BATCH_SIZE = 100
+
+    def __init__(self, folder: str = CLOUDINARY_FOLDER):
+        # El SDK se importa y configura al crear el backend, no al arrancar la app
+        import cloudinary.api
+        import cloudinary.uploader
+
+        configure_cloudinary()
+        self.uploader = cloudinary.uploader
+        self.api = cloudinary.api
+        self.cloud_name = cloudinary.config().cloud_name
+        self.folder = folder
+
+    def upload(self, data: bytes, filename: str | None = None) -> str:
+        with observe_external("cloudinary", "upload"):
+            # Con carpetas dinámicas "folder" solo fija la carpeta (asset_folder):
+            # use_asset_folder_as_public_id_prefix pone además el prefijo en el
+            # public_id, como en las cuentas con carpetas fijas
+            upload_result = self.uploader.upload(
+                data, folder=self.folder, use_asset_folder_as_public_id_prefix=True
+            )
+        return upload_result.get("secure_url")
+
+    def key(self, url: str) -> str:
+        # .../image/upload/v1712345678/carpeta/nombre.jpg -> carpeta/nombre
+        path = urlparse(url).path
+        _, found, rest = path.partition("/upload/")
+        parts = rest.split("/") if found else [path.rsplit("/", 1)[-1]]
+        if parts and re.fullmatch(r"v\d+", parts[0]):
+            parts = parts[1:]
+        return "/".join(parts).rsplit(".", 1)[0]
+
+    # https://res.cloudinary.com/<cloud_name>/image/upload/[v123/]<carpeta>/...
+    def owns(self, url: str) -> bool:
+        parsed = urlparse(url)
+        return (
+            parsed.scheme == "https"
+            and parsed.netloc == "res.cloudinary.com"
+            and parsed.path.startswith(f"/{self.cloud_name}/image/upload/")
+            and ".." not in parsed.path.split("/")
+            and not parsed.query
+            and self.key(url).startswith(f"{self.folder}/")
+        )
+
+    def delete(self, url: str) -> None:
+        with observe_external("cloudinary", "destroy"):
+            self.uploader.destroy(self.key(url))
+
+    def delete_many(self, urls: list[str]) -> dict[str, str]:
+        errors = {}
+        for start in range(0, len(urls), self.DELETE_BATCH_SIZE):
+            public_ids = {self.key(url): url for url in urls[start:start + self.DELETE_BATCH_SIZE]}
+            try:
+                with observe_external("cloudinary", "delete_resources"):
+                    result = self.api.delete_resources(list(public_ids))
+            except Exception as e:
+                errors.update({url: str(e) for url in public_ids.values()})
+                continue
+            deleted = result.get("deleted", {})
+            for public_id, url in public_ids.items():
+                # "not_found" también vale: el objetivo es que el archivo no exista
+                if deleted.get(public_id) not in ("deleted", "not_found"):
+                    errors[url] = f"Cloudinary respondió: {deleted.get(public_id)}"
+        return errors
+
+    def iter_files(self) -> Iterator[tuple[str, datetime]]:
+        options = {"type": "upload", "resource_type": "image", "prefix": f"{self.folder}/", "max_results": 500}
+        while True:
+            with observe_external("cloudinary", "resources"):
+                page = self.api.resources(**options)
+            for resource in page.get("resources", []):
+                created_at = datetime.fromisoformat(resource["created_at"].replace("Z", "+00:00"))
+                yield resource["secure_url"], created_at
+            if not page.get("next_cursor"):
+                break
+            options["next_cursor"] = page["next_cursor"]
+
+
+class LocalStorage(StorageBackend):
+    def __init__(self, directory: str, base_url: str | None = None):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.base_url = base_url.rstrip('/') if base_url else self.directory.resolve().as_uri()
+
+    def upload(self, data: bytes, filename: str | None = None) -> str:
+        extension = Path(filename).suffix if filename else ""
+        name = f"{uuid.uuid4().hex}{extension}"
+        with observe_external("local_storage", "upload"):
+            (self.directory / name).write_bytes(data)
+        return f"{self.base_url}/{name}"
+
+    def key(self, url: str) -> str:
+        return url.split('/')[-1]
+
+    def owns(self, url: str) -> bool:
+        name = url.removeprefix(f"{self.base_url}/")
+        return name != url and name not in ("", ".", "..") and not re.search(r"[/\\?#]", name)
+
+    def delete(self, url: str) -> None:
+        with observe_external("local_storage", "destroy"):
+            (self.directory / self.key(url)).unlink(missing_ok=True)
+
+    def iter_files(self) -> Iterator[tuple[str, datetime]]:
+        for path in self.directory.iterdir():
+            if path.is_file():
+                yield f"{self.base_url}/{path.name}", datetime.fromtimestamp(path.stat().st_mtime, timezone.utc)
+
+
+_storage: StorageBackend | None = None
+
+def get_storage() -> StorageBackend:
+    global _storage
+    if _storage is None:
+        if os.getenv("STORAGE_BACKEND", "cloudinary") == "local":
+            _storage = LocalStorage(
+                os.getenv("LOCAL_STORAGE_DIR", "storage"),
+                os.getenv("LOCAL_STORAGE_BASE_URL"),
+            )
+        else:
+            _storage = CloudinaryStorage()
+    return _storage
+
+def set_storage(storage: StorageBackend) -> None:
+    """Permite sustituir el backend (por ejemplo, en pruebas)."""
+    global _storage
+    _storage = storage
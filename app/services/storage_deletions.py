@@ -0,0 +1,219 @@
+# app/services/storage_deletions.py
+# Borrado de imágenes en segundo plano. Las rutas no llaman al CDN: dejan una
+# fila en la tabla storage_deletions (en la misma transacción que el cambio en
+# el diseño) y un hilo de este módulo la vacía por lotes, con reintentos y
+# backoff exponencial. Con varios procesos, cada uno toma filas distintas
+# (SKIP LOCKED en Postgres y una reserva de STORAGE_DELETE_LEASE_SECONDS); con
+# STORAGE_DELETE_WORKER=false no se arranca el hilo.
+#
+# La reconciliación busca archivos del almacenamiento que ningún diseño usa
+# (p. ej. de subidas interrumpidas) y los añade a la cola:
+#   python -m app.services.storage_deletions reconcile [--dry-run]
+#   python -m app.services.storage_deletions drain      # vacía la cola ahora
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from app.core.database import SessionLocal
+from app.crud import storage as storage_crud
+from app.services.storage import get_storage
+
+STORAGE_DELETE_WORKER = os.getenv("STORAGE_DELETE_WORKER", "true").lower() in ("1", "true", "yes")
+STORAGE_DELETE_BATCH_SIZE = int(os.getenv("STORAGE_DELETE_BATCH_SIZE", "100"))
+STORAGE_DELETE_POLL_SECONDS = float(os.getenv("STORAGE_DELETE_POLL_SECONDS", "30"))
+STORAGE_DELETE_RETRY_BACKOFF = float(os.getenv("STORAGE_DELETE_RETRY_BACKOFF", "30"))
+STORAGE_DELETE_MAX_BACKOFF = float(os.getenv("STORAGE_DELETE_MAX_BACKOFF", "3600"))
+# Tiempo que un lote queda reservado para el worker que lo tomó. Si el proceso
+# muere a mitad, las filas vuelven a estar disponibles al vencer.
+STORAGE_DELETE_LEASE_SECONDS = float(os.getenv("STORAGE_DELETE_LEASE_SECONDS", "300"))
+# Los archivos más recientes pueden ser de una subida en curso (aún sin URL en la BD)
+RECONCILE_GRACE_SECONDS = float(os.getenv("RECONCILE_GRACE_SECONDS", "3600"))
+
+logger = logging.getLogger("app.storage_deletions")
+
+_stats_lock = threading.Lock()
+_deleted_total = 0
+_failed_attempts_total = 0
+_skipped_in_use_total = 0
+_last_batch_seconds = 0.0
+
+_wake = threading.Event()
+_stop = threading.Event()
+_thread: threading.Thread | None = None
+
+
+def _retry_delay(attempts: int) -> timedelta:
+    return timedelta(seconds=min(STORAGE_DELETE_RETRY_BACKOFF * (2 ** (attempts - 1)), STORAGE_DELETE_MAX_BACKOFF))
+
+
+def process_batch() -> int:
+    """Procesa un lote de borrados pendientes. Devuelve cuántas filas tomó."""
+    global _deleted_total, _failed_attempts_total, _skipped_in_use_total, _last_batch_seconds
+    now = datetime.now(timezone.utc)
+
+    # 1) Reservar el lote en una transacción corta. Las URLs que algún diseño
+    # sigue usando salen de la cola sin tocar el archivo
+    db = SessionLocal()
+    try:
+        rows = storage_crud.claim_due_deletions(
+            db, now, STORAGE_DELETE_BATCH_SIZE, now + timedelta(seconds=STORAGE_DELETE_LEASE_SECONDS)
+        )
+        in_use = storage_crud.get_urls_in_use(db, {row.url for row in rows}) if rows else set()
+        for row in rows:
+            if row.url in in_use:
+                db.delete(row)
+        claimed = {row.id: row.url for row in rows if row.url not in in_use}
+        db.commit()
+    finally:
+        db.close()
+    skipped = len(rows) - len(claimed)
+    if skipped:
+        with _stats_lock:
+            _skipped_in_use_total += skipped
+        logger.info(f"{skipped} archivos de la cola de borrados siguen en uso: no se eliminan")
+    if not claimed:
+        return len(rows)
+
+    # 2) Llamar al CDN sin ninguna transacción ni conexión abierta
+    start = time.perf_counter()
+    urls = list(dict.fromkeys(claimed.values()))
+    try:
+        errors = get_storage().delete_many(urls)
+    except Exception as e:
+        errors = {url: str(e) for url in urls}
+    elapsed = time.perf_counter() - start
+
+    # 3) Guardar el resultado en otra transacción
+    failed = sum(1 for url in claimed.values() if url in errors)
+    retry_from = datetime.now(timezone.utc)
+    db = SessionLocal()
+    try:
+        for row in storage_crud.get_deletions(db, list(claimed)):
+            error = errors.get(row.url)
+            if error is None:
+                db.delete(row)
+                continue
+            row.attempts += 1
+            row.last_error = error[:500]
+            row.next_attempt_at = retry_from + _retry_delay(row.attempts)
+        db.commit()
+    finally:
+        db.close()
+
+    with _stats_lock:
+        _deleted_total += len(claimed) - failed
+        _failed_attempts_total += failed
+        _last_batch_seconds = elapsed
+    if failed:
+        logger.warning(f"No se pudieron eliminar {failed} archivos del almacenamiento; se reintentará")
+    return len(rows)
+
+
+def drain():
+    """Procesa lotes hasta que no quede ningún borrado vencido."""
+    while process_batch() == STORAGE_DELETE_BATCH_SIZE and not _stop.is_set():
+        pass
+
+
+def _run():
+    while not _stop.is_set():
+        try:
+            drain()
+        except Exception as e:
+            # Base de datos no disponible, p. ej.: lo intentamos en el siguiente ciclo
+            logger.warning(f"Error al procesar la cola de borrados: {e}")
+        _wake.wait(STORAGE_DELETE_POLL_SECONDS)
+        _wake.clear()
+
+
+def wake():
+    """Avisa al worker de que hay borrados nuevos (no espera al siguiente ciclo)."""
+    _wake.set()
+
+
+def start_worker():
+    global _thread
+    if not STORAGE_DELETE_WORKER or _thread is not None:
+        return
+    _stop.clear()
+    _thread = threading.Thread(target=_run, name="storage-deletions", daemon=True)
+    _thread.start()
+
+
+def stop_worker(timeout: float = 10):
+    global _thread
+    if _thread is None:
+        return
+    _stop.set()
+    _wake.set()
+    _thread.join(timeout)
+    _thread = None
+
+
+def find_orphans(older_than: timedelta = timedelta(seconds=RECONCILE_GRACE_SECONDS)) -> list[str]:
+    """URLs del almacenamiento que no usa ningún diseño ni están ya en la cola."""
+    storage = get_storage()
+    cutoff = datetime.now(timezone.utc) - older_than
+    db = SessionLocal()
+    try:
+        known = {storage.key(url) for url in storage_crud.iter_known_urls(db) if url}
+    finally:
+        db.close()
+    return [
+        url for url, created_at in storage.iter_files()
+        if created_at < cutoff and storage.key(url) not in known
+    ]
+
+
+def reconcile(dry_run: bool = False) -> list[str]:
+    """Añade a la cola los archivos huérfanos y devuelve sus URLs."""
+    orphans = find_orphans()
+    if orphans and not dry_run:
+        db = SessionLocal()
+        try:
+            storage_crud.queue_deletions(db, orphans)
+            db.commit()
+        finally:
+            db.close()
+        wake()
+    return orphans
+
+
+def get_stats():
+    with _stats_lock:
+        return {
+            "deleted_total": _deleted_total,
+            "failed_attempts_total": _failed_attempts_total,
+            "skipped_in_use_total": _skipped_in_use_total,
+            "last_batch_seconds": round(_last_batch_seconds, 4),
+            "worker_running": _thread is not None,
+        }
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Cola de borrados del almacenamiento")
+    parser.add_argument("command", choices=["reconcile", "drain"])
+    parser.add_argument("--dry-run", action="store_true", help="reconcile: solo muestra los huérfanos")
+    args = parser.parse_args()
+
+    if args.command == "reconcile":
+        orphans = reconcile(dry_run=args.dry_run)
+        for url in orphans:
+            print(url)
+        action = "encontrados" if args.dry_run else "añadidos a la cola"
+        print(f"{len(orphans)} archivos huérfanos {action}")
+    else:
+        drain()
+        db = SessionLocal()
+        try:
+            print(f"Pendientes (con reintento programado): {storage_crud.count_pending_deletions(db)}")
+        finally:
+            db.close()
+
+
+if __name__ == "__main__":
+    main()
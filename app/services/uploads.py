@@ -0,0 +1,177 @@
+# app/services/uploads.py
+# Subida de imágenes en segundo plano: el diseño se guarda primero con la
+# imagen en estado "pending" y la subida se hace en un pool de hilos acotado,
+# con reintentos. Antes de subirla se normaliza y se genera la miniatura.
+# Al terminar se escriben las URLs en el diseño y, si reemplazan a otras
+# (PATCH), las anteriores pasan a la cola de borrados.
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from fastapi import HTTPException, status
+from sqlalchemy import update
+
+from app.core.database import SessionLocal
+from app.crud import storage as storage_crud
+from app.models import design as design_model
+from app.services.storage import get_storage
+
+SCREENSHOT_PENDING = "pending"
+SCREENSHOT_READY = "ready"
+SCREENSHOT_FAILED = "failed"
+
+UPLOAD_WORKERS = int(os.getenv("UPLOAD_WORKERS", "4"))
+UPLOAD_MAX_RETRIES = int(os.getenv("UPLOAD_MAX_RETRIES", "3"))
+UPLOAD_RETRY_BACKOFF = float(os.getenv("UPLOAD_RETRY_BACKOFF", "1.0"))
+# Cada subida en cola retiene los bytes de la imagen: el pool limita cuántas se
+# procesan a la vez, esto cuántas pueden esperar (y, con ello, la memoria).
+# Como en el pool de contraseñas, por encima del límite se responde 503.
+UPLOAD_MAX_PENDING = int(os.getenv("UPLOAD_MAX_PENDING", "64"))
+
+logger = logging.getLogger("app.uploads")
+
+# Se crea al primer uso y shutdown() lo descarta: otro lifespan en el mismo
+# proceso (un segundo TestClient, una recarga) crea uno nuevo
+_executor: ThreadPoolExecutor | None = None
+_executor_lock = threading.Lock()
+
+_stats_lock = threading.Lock()
+_stats = {"pending": 0, "completed": 0, "rejected": 0}
+
+
+def get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=UPLOAD_WORKERS, thread_name_prefix="screenshot-upload")
+    return _executor
+
+
+def _upload_with_retries(data: bytes, filename: str | None) -> str:
+    storage = get_storage()
+    for attempt in range(UPLOAD_MAX_RETRIES + 1):
+        try:
+            return storage.upload(data, filename)
+        except Exception:
+            if attempt == UPLOAD_MAX_RETRIES:
+                raise
+            # Backoff exponencial entre intentos: 1s, 2s, 4s...
+            time.sleep(UPLOAD_RETRY_BACKOFF * (2 ** attempt))
+
+
+def _process_upload(design_id: int, data: bytes):
+    # PIL se importa aquí y no al arrancar la app
+    from app.services.images import normalize_screenshot
+
+    screenshot_url = thumbnail_url = None
+    try:
+        screenshot, thumbnail = normalize_screenshot(data)
+        screenshot_url = _upload_with_retries(screenshot, "screenshot.jpg")
+        thumbnail_url = _upload_with_retries(thumbnail, "thumbnail.webp")
+        status = SCREENSHOT_READY
+    except Exception:
+        logger.warning(f"No se pudo procesar la imagen del diseño {design_id}", exc_info=True)
+        status = SCREENSHOT_FAILED
+
+    db = SessionLocal()
+    try:
+        db_design = db.get(design_model.Design, design_id)
+        if db_design is None or status == SCREENSHOT_FAILED:
+            # El diseño se eliminó mientras se subía la imagen, o solo se subió
+            # una de las variantes: no dejamos archivos huérfanos
+            storage_crud.queue_deletions(db, [screenshot_url, thumbnail_url])
+        if db_design is not None:
+            if status == SCREENSHOT_READY:
+                # Si es un reemplazo (PATCH), la imagen anterior va a la cola de
+                # borrados en la misma transacción que guarda la nueva.
+                # Si falla, el diseño conserva la anterior y queda en "failed".
+                storage_crud.queue_deletions(db, [db_design.screenshot_url, db_design.thumbnail_url])
+                db_design.screenshot_url = screenshot_url
+                db_design.thumbnail_url = thumbnail_url
+            db_design.screenshot_status = status
+        db.commit()
+    finally:
+        db.close()
+    # Se importa aquí para que arrancar la app no cargue la cola de borrados
+    from app.services import storage_deletions
+    storage_deletions.wake()
+
+
+def _mark_failed(design_id: int):
+    db = SessionLocal()
+    try:
+        db.execute(
+            update(design_model.Design)
+            .where(design_model.Design.id == design_id, design_model.Design.screenshot_status == SCREENSHOT_PENDING)
+            .values(screenshot_status=SCREENSHOT_FAILED)
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
+# Los errores de la imagen ya los trata _process_upload; esto recoge los demás
+# (base de datos caída al guardar el resultado, p. ej.), que si no se perderían
+# en el future sin que nadie los viera y el diseño se quedaría en "pending"
+def _on_upload_done(design_id: int, future: Future):
+    with _stats_lock:
+        _stats["pending"] -= 1
+        _stats["completed"] += 1
+    error = future.exception()
+    if error is None:
+        return
+    logger.error(f"Error al guardar la imagen del diseño {design_id}", exc_info=error)
+    try:
+        _mark_failed(design_id)
+    except Exception as e:
+        logger.error(f"No se pudo marcar como fallida la imagen del diseño {design_id}: {e}")
+
+
+def ensure_capacity():
+    """Rechaza con 503 si ya hay UPLOAD_MAX_PENDING subidas en cola.
+
+    Las rutas la llaman antes de leer la imagen y de guardar nada en la base de
+    datos, para no dejar el diseño en "pending" sin subida.
+    """
+    with _stats_lock:
+        if _stats["pending"] >= UPLOAD_MAX_PENDING:
+            _stats["rejected"] += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Hay demasiadas imágenes pendientes de subir, inténtalo de nuevo en unos segundos",
+                headers={"Retry-After": "5"},
+            )
+
+
+def enqueue_screenshot_upload(design_id: int, data: bytes):
+    """Programa el procesado y la subida de la imagen de un diseño ya guardado."""
+    with _stats_lock:
+        _stats["pending"] += 1
+    try:
+        future = get_executor().submit(_process_upload, design_id, data)
+    except Exception:
+        with _stats_lock:
+            _stats["pending"] -= 1
+        raise
+    future.add_done_callback(lambda done: _on_upload_done(design_id, done))
+    return future
+
+
+def get_stats():
+    with _stats_lock:
+        stats = dict(_stats)
+    stats["workers"] = UPLOAD_WORKERS
+    stats["max_pending"] = UPLOAD_MAX_PENDING
+    return stats
+
+
+def shutdown(wait: bool = True):
+    """Espera a que terminen las subidas pendientes y cierra el pool, si se llegó a crear."""
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=wait)
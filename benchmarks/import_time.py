@@ -0,0 +1,94 @@
+# benchmarks/import_time.py
+# Comprueba que importar app.main sea rápido y no cargue dependencias pesadas
+# (stack de PDF, SDK de Cloudinary, Alembic). Cada medición se hace en un
+# proceso nuevo, como en el arranque en frío de un worker.
+#
+# Uso:
+#   python -m benchmarks.import_time                 # mediana de 5 arranques
+#   python -m benchmarks.import_time --budget 0.8    # falla (código 1) si se supera
+#   python -m benchmarks.import_time --top 15        # módulos que más tardan
+#
+# Importar la app no conecta a la base de datos, así que basta con cualquier
+# DATABASE_URL (por defecto se usa una SQLite que no se llega a crear).
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+DEFAULT_BUDGET_SECONDS = 1.0
+
+# Módulos que solo deben cargarse cuando se usan
+LAZY_MODULES = ("fpdf", "PIL", "requests", "cloudinary", "alembic", "jose", "app.services.storage_deletions")
+
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import app.main
+elapsed = time.perf_counter() - start
+print(json.dumps({"seconds": elapsed, "loaded": [m for m in %r if m in sys.modules]}))
+""" % (LAZY_MODULES,)
+
+
+def _env():
+    env = dict(os.environ)
+    env.setdefault("DATABASE_URL", "sqlite:///./import-time-check.sqlite")
+    env.setdefault("SECRET_KEY", "import-time-check")
+    return env
+
+
+def measure_once():
+    result = subprocess.run(
+        [sys.executable, "-c", _PROBE],
+        cwd=ROOT, env=_env(), capture_output=True, text=True, check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def slowest_imports(top: int):
+    # -X importtime escribe en stderr: "import time: self | cumulative | módulo"
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=ROOT, env=_env(), capture_output=True, text=True, check=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        parts = line.split("|")
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        rows.append((int(parts[1]), parts[2].rstrip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget", type=float, default=DEFAULT_BUDGET_SECONDS, help="segundos (mediana)")
+    parser.add_argument("--top", type=int, default=0, help="mostrar los N módulos más lentos")
+    args = parser.parse_args()
+
+    samples = [measure_once() for _ in range(args.runs)]
+    median = statistics.median(sample["seconds"] for sample in samples)
+    loaded = sorted({module for sample in samples for module in sample["loaded"]})
+
+    print(f"import app.main: mediana {median * 1000:.0f} ms en {args.runs} arranques (presupuesto {args.budget * 1000:.0f} ms)")
+    if args.top:
+        for cumulative_us, module in slowest_imports(args.top):
+            print(f"  {cumulative_us / 1000:8.1f} ms  {module}")
+
+    failed = False
+    if median > args.budget:
+        print("ERROR: se supera el presupuesto de tiempo de importación")
+        failed = True
+    if loaded:
+        print(f"ERROR: se cargan al importar módulos que deberían ser perezosos: {', '.join(loaded)}")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
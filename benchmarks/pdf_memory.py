@@ -0,0 +1,142 @@
+# benchmarks/pdf_memory.py
+# Comprueba que la memoria al generar el PDF de un diseño no crezca con la
+# resolución de la captura: el JPEG se incrusta tal cual, sin decodificarlo.
+# Cada tamaño se mide en un proceso nuevo (el pico de RSS de un proceso solo
+# puede subir, así que medir varios tamaños en el mismo no diría nada).
+#
+# Uso:
+#   python -m benchmarks.pdf_memory                          # tamaños por defecto
+#   python -m benchmarks.pdf_memory --sizes 1000x750 6000x4500
+#   python -m benchmarks.pdf_memory --tolerance-mb 8         # falla (código 1) si crece más
+#
+# Lo medido es el pico de RSS (VmHWM) durante generate_design_pdf menos el
+# RSS justo antes. El PDF contiene el JPEG, así que parte de la memoria crece
+# con el tamaño del archivo (unas pocas copias: descarga, PDF en construcción y
+# bytes de salida); lo que no puede crecer es el resto, que sería la imagen
+# decodificada (ancho x alto x 3 bytes). Requiere Linux (/proc).
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from io import BytesIO
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+DEFAULT_SIZES = ("1000x750", "2000x1500", "4000x3000", "6000x4500")
+DEFAULT_TOLERANCE_MB = 8.0
+# Copias del JPEG que es normal tener a la vez en memoria
+FILE_COPIES = 4
+
+_PROBE = """
+import json, sys
+
+from app.schemas import design as design_schema
+from app.services import image_fetcher, pdf_generator
+
+# VmHWM (pico de RSS) y no ru_maxrss: tras exec, ru_maxrss conserva el pico
+# del proceso padre, que aquí acaba de generar una imagen grande
+def status_mb(field):
+    with open("/proc/self/status") as status:
+        for line in status:
+            if line.startswith(field + ":"):
+                return int(line.split()[1]) / 1024
+
+def reset_peak():
+    # "5" pone VmHWM al RSS actual (Linux 4.0+)
+    with open("/proc/self/clear_refs", "w") as clear_refs:
+        clear_refs.write("5")
+
+class FileFetcher:
+    def __init__(self, path):
+        self.path = path
+    def fetch_bytes(self, url):
+        with open(self.path, "rb") as image_file:
+            return image_file.read()
+
+design = design_schema.Design(
+    id=1, owner_id=1, name="Memoria", screenshot_url="http://cdn.local/captura.jpg",
+    items=[{"id": i, "item_name": f"planta {i}", "quantity": i} for i in range(20)],
+)
+
+# Primera pasada con una imagen pequeña: carga fuentes y módulos de fpdf2
+image_fetcher.set_image_fetcher(FileFetcher(sys.argv[1]))
+pdf_generator.generate_design_pdf(design)
+
+image_fetcher.set_image_fetcher(FileFetcher(sys.argv[2]))
+reset_peak()
+before = status_mb("VmRSS")
+pdf, complete = pdf_generator.generate_design_pdf(design)
+print(json.dumps({"delta_mb": status_mb("VmHWM") - before, "pdf_mb": len(pdf) / (1024 * 1024), "complete": complete}))
+"""
+
+
+def _screenshot(width: int, height: int) -> bytes:
+    from PIL import Image
+    # Degradado con ruido para que el JPEG tenga un tamaño realista
+    gradient = Image.linear_gradient("L").resize((width, height))
+    noise = Image.effect_noise((width, height), 48)
+    img = Image.merge("RGB", (gradient, noise, Image.blend(gradient, noise, 0.5)))
+    buffer = BytesIO()
+    img.save(buffer, format="JPEG", quality=85)
+    return buffer.getvalue()
+
+
+def measure(warmup_path: str, image_path: str) -> dict:
+    result = subprocess.run(
+        [sys.executable, "-c", _PROBE, warmup_path, image_path],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+        env={**os.environ, "DATABASE_URL": os.getenv("DATABASE_URL", "sqlite:///./pdf-memory-check.sqlite")},
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memoria al generar el PDF según la resolución de la captura")
+    parser.add_argument("--sizes", nargs="+", default=list(DEFAULT_SIZES), help="ANCHOxALTO")
+    parser.add_argument("--tolerance-mb", type=float, default=DEFAULT_TOLERANCE_MB)
+    args = parser.parse_args()
+
+    rows = []
+    with tempfile.TemporaryDirectory() as workdir:
+        warmup_path = os.path.join(workdir, "warmup.jpg")
+        Path(warmup_path).write_bytes(_screenshot(200, 150))
+        for size in args.sizes:
+            width, height = (int(value) for value in size.lower().split("x"))
+            image_path = os.path.join(workdir, f"{size}.jpg")
+            data = _screenshot(width, height)
+            Path(image_path).write_bytes(data)
+            result = measure(warmup_path, image_path)
+            file_mb = len(data) / (1024 * 1024)
+            rows.append({
+                "size": size,
+                "file_mb": file_mb,
+                "decoded_mb": width * height * 3 / (1024 * 1024),
+                "overhead_mb": result["delta_mb"] - FILE_COPIES * file_mb,
+                **result,
+            })
+
+    print(f"{'tamaño':<12} {'JPEG':>8} {'decodif.':>9} {'pico':>8} {'resto':>8}")
+    for row in rows:
+        print(
+            f"{row['size']:<12} {row['file_mb']:7.1f}M {row['decoded_mb']:8.1f}M "
+            f"{row['delta_mb']:7.1f}M {row['overhead_mb']:7.1f}M"
+        )
+
+    failed = False
+    if not all(row["complete"] for row in rows):
+        print("ERROR: alguna imagen no se incrustó en el PDF")
+        failed = True
+    smallest = min(rows, key=lambda row: row["overhead_mb"])
+    largest = max(rows, key=lambda row: row["overhead_mb"])
+    growth = largest["overhead_mb"] - smallest["overhead_mb"]
+    if growth > args.tolerance_mb:
+        print(f"ERROR: la memoria crece con la resolución ({largest['size']}: {growth:.1f} MB más que {smallest['size']})")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+# benchmarks/query_plans.py
+# Imprime el plan de ejecución de las consultas por usuario/diseño que usa la API,
+# contra la base configurada en DATABASE_URL (con las migraciones aplicadas).
+# Los planes de referencia están en benchmarks/query_plans/<dialecto>.txt:
+#
+#   python -m benchmarks.query_plans > benchmarks/query_plans/sqlite.txt
+from sqlalchemy import delete, select, text
+
+from app.core.database import engine
+from app.crud import design as design_crud
+from app.models import design as design_model, user as user_model  # noqa: F401 (relación Design.owner)
+
+USER_ID = 1
+DESIGN_ID = 1
+
+
+def _queries(dialect: str):
+    return {
+        "Listado paginado de diseños (GET /designs/)":
+            design_crud._paginate(
+                select(design_model.Design).where(design_model.Design.owner_id == USER_ID), 100, 50
+            ),
+        "Items de los diseños listados (selectinload)":
+            select(design_model.DesignItem).where(design_model.DesignItem.design_id.in_([1, 2, 3])),
+        "Resumen de diseños (GET /designs/summary)":
+            design_crud._user_design_summaries_stmt(USER_ID, 100, 50),
+        "Diseño por id (PDF / DELETE)":
+            design_crud._design_by_id_stmt(DESIGN_ID, load_items=False),
+        "Borrado en cascada de los items (ON DELETE CASCADE)":
+            delete(design_model.DesignItem).where(design_model.DesignItem.design_id == DESIGN_ID),
+        "Búsqueda por nombre o items (GET /designs/search?q=rosal)":
+            design_crud._search_stmt(dialect, USER_ID, ["rosal"], 50, 0),
+    }
+
+
+def main():
+    with engine.connect() as connection:
+        dialect = connection.dialect.name
+        explain = "EXPLAIN QUERY PLAN" if dialect == "sqlite" else "EXPLAIN"
+        print(f"# Planes de consulta ({dialect})\n")
+        for title, stmt in _queries(dialect).items():
+            sql = str(stmt.compile(dialect=connection.dialect, compile_kwargs={"literal_binds": True}))
+            print(f"## {title}\n{sql}\n")
+            for row in connection.execute(text(f"{explain} {sql}")):
+                print("    " + " | ".join(str(value) for value in row))
+            print()
+
+
+if __name__ == "__main__":
+    main()
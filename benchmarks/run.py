@@ -0,0 +1,454 @@
+# benchmarks/run.py
+# Benchmark reproducible de la API: levanta app.main:app dentro del mismo proceso
+# (httpx + ASGITransport) contra una base SQLite temporal, con el backend de
+# almacenamiento local en lugar de Cloudinary y un servidor HTTP local que hace
+# de CDN para las capturas.
+#
+# Uso:
+#   python -m benchmarks.run                      # ejecuta y guarda benchmarks/results/<commit>.json
+#   python -m benchmarks.run --designs 200 --concurrency 32
+#   python -m benchmarks.run --compare OLD.json NEW.json
+import argparse
+import asyncio
+import functools
+import http.server
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from io import BytesIO
+from pathlib import Path
+
+BENCHMARKS_DIR = Path(__file__).resolve().parent
+RESULTS_DIR = BENCHMARKS_DIR / "results"
+
+
+def _configure_environment(workdir: Path, storage_dir: Path, cdn_port: int):
+    # Todo tiene que estar configurado antes de importar la app
+    defaults = {
+        "DATABASE_URL": f"sqlite:///{workdir / 'bench.sqlite'}",
+        "SECRET_KEY": "benchmark",
+        "ACCESS_TOKEN_EXPIRE_MINUTES": "60",
+        "STORAGE_BACKEND": "local",
+        "LOCAL_STORAGE_DIR": str(storage_dir),
+        "LOCAL_STORAGE_BASE_URL": f"http://127.0.0.1:{cdn_port}",
+        # Sin caché para medir el coste real de generar el PDF
+        "PDF_CACHE_BACKEND": "none",
+        # El benchmark mide el throughput: sin límites de peticiones
+        "RATE_LIMIT_ENABLED": "false",
+    }
+    for key, value in defaults.items():
+        os.environ.setdefault(key, value)
+
+
+def _start_cdn(directory: Path) -> http.server.ThreadingHTTPServer:
+    class QuietHandler(http.server.SimpleHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer(
+        ("127.0.0.1", 0), functools.partial(QuietHandler, directory=str(directory))
+    )
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def _screenshot(width: int, height: int) -> bytes:
+    from PIL import Image
+    buffer = BytesIO()
+    # Un degradado para que el JPEG no sea trivial de comprimir
+    img = Image.linear_gradient("L").resize((width, height)).convert("RGB")
+    img.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def _peak_rss_mb() -> float:
+    # Pico de todo el proceso hasta ese momento, no de cada escenario (solo
+    # puede subir). La memoria del PDF según la resolución se mide aparte, en
+    # un proceso por tamaño: python -m benchmarks.pdf_memory
+    # En Linux ru_maxrss viene en KB, en macOS en bytes
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BENCHMARKS_DIR, text=True
+        ).strip()
+    except Exception:
+        return "unknown"
+
+
+async def _measure(name, requests, concurrency):
+    """Ejecuta las peticiones (corrutinas sin argumentos) y devuelve sus estadísticas."""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = 0
+
+    async def run(make_request):
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            response = await make_request()
+            latencies.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                errors += 1
+            return response
+
+    start = time.perf_counter()
+    responses = await asyncio.gather(*(run(request) for request in requests))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    result = {
+        "name": name,
+        "requests": len(latencies),
+        "errors": errors,
+        "concurrency": concurrency,
+        "p50_ms": statistics.median(latencies) * 1000 if latencies else 0.0,
+        "p99_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000 if latencies else 0.0,
+        "mean_ms": statistics.fmean(latencies) * 1000 if latencies else 0.0,
+        "throughput_rps": len(latencies) / elapsed if elapsed else 0.0,
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+    print(
+        f"{name:<28} {result['requests']:>5} req  {result['errors']:>3} err  "
+        f"p50 {result['p50_ms']:8.1f} ms  p99 {result['p99_ms']:8.1f} ms  "
+        f"{result['throughput_rps']:8.1f} req/s  rss {result['peak_rss_mb']:.0f} MB"
+    )
+    return result, responses
+
+
+async def _wait_for_uploads(client, headers, timeout=120):
+    # Las capturas se suben en segundo plano: esperamos a que estén todas listas
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        designs, after_id = [], None
+        while True:
+            params = {"limit": 200, **({"after_id": after_id} if after_id else {})}
+            response = await client.get("/designs/", params=params, headers=headers)
+            designs.extend(response.json())
+            after_id = response.headers.get("x-next-cursor")
+            if not after_id:
+                break
+        if all(design["screenshot_status"] != "pending" for design in designs):
+            return designs
+        await asyncio.sleep(0.1)
+    raise RuntimeError("Las capturas no terminaron de subirse a tiempo")
+
+
+# Tamaños del listado para comprobar que el número de consultas SQL de
+# GET /designs/ no crece con el número de diseños (sin N+1)
+QUERY_COUNT_SIZES = (1, 10, 100)
+
+
+async def _count_list_queries(client, headers) -> int:
+    from sqlalchemy import event
+
+    from app.core.database import get_async_engine
+
+    statements = []
+    engine = get_async_engine().sync_engine
+    listener = lambda *event_args: statements.append(1)
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        await client.get("/designs/", params={"limit": 200}, headers=headers)
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    return len(statements)
+
+
+async def _check_list_queries(client, password, items):
+    # Usuario propio: se le van importando diseños hasta cada tamaño
+    email = "queries@bench.test"
+    await client.post("/users/", json={"email": email, "password": password})
+    response = await client.post("/token", data={"username": email, "password": password})
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    counts, total = {}, 0
+    for size in QUERY_COUNT_SIZES:
+        payload = [
+            {"name": f"consultas {total + i}", "items": [{"item_name": f"planta {j}", "quantity": 1} for j in range(items)]}
+            for i in range(size - total)
+        ]
+        await client.post("/designs/import", json=payload, headers=headers)
+        total = size
+        counts[size] = await _count_list_queries(client, headers)
+
+    passed = len(set(counts.values())) == 1
+    summary = ", ".join(f"N={size}: {count}" for size, count in counts.items())
+    print(f"consultas SQL por GET /designs/: {summary}" + ("" if passed else "  ERROR: crece con N"))
+    return {"name": "list_designs_sql_queries", "counts": counts, "passed": passed}
+
+
+SYNC_LIST_PATH = "/bench/designs-sync"
+
+
+def _mount_sync_list_route(app):
+    # Solo para el benchmark: el mismo listado que GET /designs/ (misma consulta
+    # y misma respuesta) con una ruta "def" y una Session síncrona, como eran
+    # todas las rutas antes de la capa async. FastAPI la ejecuta en el threadpool
+    # de Starlette (40 hilos), que es lo que limitaba la concurrencia.
+    from typing import List
+
+    from fastapi import Depends
+
+    from app.core.database import SessionLocal
+    from app.core.security import get_current_user
+    from app.crud import design as design_crud
+    from app.schemas import design as design_schema
+
+    def list_designs_sync(current_user=Depends(get_current_user)):
+        db = SessionLocal()
+        try:
+            return db.scalars(design_crud._user_designs_stmt(current_user.id, None, 200)).all()
+        finally:
+            db.close()
+
+    app.add_api_route(SYNC_LIST_PATH, list_designs_sync, response_model=List[design_schema.Design])
+
+
+async def _compare_sync_async(client, headers, args):
+    # Mismo listado con la ruta async (AsyncSession) y con la síncrona, a alta concurrencia
+    results = []
+    for name, path in (("list_async_high_concurrency", "/designs/"), ("list_sync_high_concurrency", SYNC_LIST_PATH)):
+        result, _ = await _measure(name, [
+            functools.partial(client.get, path, params={"limit": 200}, headers=headers)
+            for _ in range(args.reads)
+        ], args.high_concurrency)
+        results.append(result)
+    async_result, sync_result = results
+    async_result["sync_throughput_rps"] = sync_result["throughput_rps"]
+    print(
+        f"  async/sync con {args.high_concurrency} a la vez: {async_result['throughput_rps']:.1f}/"
+        f"{sync_result['throughput_rps']:.1f} req/s  p99 {async_result['p99_ms']:.1f}/{sync_result['p99_ms']:.1f} ms"
+    )
+    return results
+
+
+async def run_benchmarks(args):
+    import httpx
+
+    from app.core.database import get_async_engine
+    from app.main import app
+
+    scenarios = []
+    checks = []
+    screenshot = _screenshot(args.screenshot_width, args.screenshot_height)
+    password = "benchmark-password"
+
+    _mount_sync_list_route(app)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=300) as client:
+        # --- Alta e inicio de sesión ---
+        emails = [f"user{i}@bench.test" for i in range(args.users)]
+        result, _ = await _measure("signup", [
+            functools.partial(client.post, "/users/", json={"email": email, "password": password})
+            for email in emails
+        ], args.concurrency)
+        scenarios.append(result)
+
+        result, responses = await _measure("login", [
+            functools.partial(client.post, "/token", data={"username": email, "password": password})
+            for email in emails
+        ], args.concurrency)
+        scenarios.append(result)
+        headers = {"Authorization": f"Bearer {responses[0].json()['access_token']}"}
+
+        # --- Creación de diseños con captura ---
+        design_data = json.dumps({
+            "name": "Jardín de benchmark",
+            "items": [{"item_name": f"planta {i}", "quantity": i + 1} for i in range(args.items)],
+        })
+        result, _ = await _measure("create_design", [
+            functools.partial(
+                client.post, "/designs/",
+                data={"design_data": design_data},
+                files={"screenshot_file": ("captura.png", screenshot, "image/png")},
+                headers=headers,
+            )
+            for _ in range(args.designs)
+        ], args.concurrency)
+        scenarios.append(result)
+        designs = await _wait_for_uploads(client, headers)
+        design_ids = [design["id"] for design in designs]
+
+        # --- Listados (y consultas SQL por listado, que no debe crecer con N) ---
+        checks.append(await _check_list_queries(client, password, args.items))
+        statements = await _count_list_queries(client, headers)
+
+        result, _ = await _measure("list_designs", [
+            functools.partial(client.get, "/designs/", params={"limit": 200}, headers=headers)
+            for _ in range(args.reads)
+        ], args.concurrency)
+        result["sql_queries_per_request"] = statements
+        scenarios.append(result)
+
+        baseline = result
+        scenarios.extend(await _compare_sync_async(client, headers, args))
+
+        # --- Lecturas durante una avalancha de logins ---
+        # El doble de logins que PASSWORD_HASH_MAX_PENDING, todos a la vez, junto
+        # con el mismo número de lecturas de GET /designs/: bcrypt va a su propio
+        # pool, así que las lecturas no deberían empeorar y los logins que no
+        # caben en la cola reciben 503 en lugar de esperar
+        from app.core import security
+
+        storm_size = security.PASSWORD_HASH_MAX_PENDING * 2
+        (storm_result, storm_responses), (result, _) = await asyncio.gather(
+            _measure("login_storm", [
+                functools.partial(client.post, "/token", data={"username": emails[i % len(emails)], "password": password})
+                for i in range(storm_size)
+            ], storm_size),
+            _measure("list_designs_during_login_storm", [
+                functools.partial(client.get, "/designs/", params={"limit": 200}, headers=headers)
+                for _ in range(args.reads)
+            ], args.concurrency),
+        )
+        storm_result["status_503"] = sum(1 for response in storm_responses if response.status_code == 503)
+        result["baseline_p50_ms"] = baseline["p50_ms"]
+        result["baseline_p99_ms"] = baseline["p99_ms"]
+        print(
+            f"  lecturas con/sin avalancha: p50 {result['p50_ms']:.1f}/{baseline['p50_ms']:.1f} ms  "
+            f"p99 {result['p99_ms']:.1f}/{baseline['p99_ms']:.1f} ms  "
+            f"logins rechazados (503): {storm_result['status_503']} de {storm_size}"
+        )
+        scenarios.extend([storm_result, result])
+
+        result, _ = await _measure("list_summaries", [
+            functools.partial(client.get, "/designs/summary", params={"limit": 200}, headers=headers)
+            for _ in range(args.reads)
+        ], args.concurrency)
+        scenarios.append(result)
+
+        result, _ = await _measure("materials", [
+            functools.partial(client.get, "/designs/materials", headers=headers)
+            for _ in range(args.reads)
+        ], args.concurrency)
+        scenarios.append(result)
+
+        result, _ = await _measure("search", [
+            functools.partial(client.get, "/designs/search", params={"q": "plan"}, headers=headers)
+            for _ in range(args.reads)
+        ], args.concurrency)
+        scenarios.append(result)
+
+        # --- Descarga de PDF ---
+        result, _ = await _measure("pdf_download", [
+            functools.partial(client.get, f"/designs/{design_id}/pdf", headers=headers)
+            for design_id in design_ids
+        ], args.concurrency)
+        scenarios.append(result)
+
+        # --- Importación en bloque con 10/100/1000 items por diseño ---
+        for item_count in (10, 100, 1000):
+            payload = [{
+                "name": f"importado {item_count}",
+                "items": [{"item_name": f"planta {i}", "quantity": 1} for i in range(item_count)],
+            }]
+            result, responses = await _measure(f"import_{item_count}_items", [
+                functools.partial(client.post, "/designs/import", json=payload, headers=headers)
+                for _ in range(args.imports)
+            ], args.concurrency)
+            scenarios.append(result)
+            design_ids.extend(design["id"] for response in responses for design in response.json())
+
+        # --- Eliminación ---
+        result, _ = await _measure("delete_design", [
+            functools.partial(client.delete, f"/designs/{design_id}", headers=headers)
+            for design_id in design_ids
+        ], args.concurrency)
+        scenarios.append(result)
+
+    # Cerramos las conexiones (aiosqlite usa un hilo por conexión)
+    await get_async_engine().dispose()
+    return scenarios, checks
+
+
+def _save(scenarios, checks, args) -> Path:
+    RESULTS_DIR.mkdir(exist_ok=True)
+    commit = _git_commit()
+    results = {
+        "commit": commit,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "parameters": {key: value for key, value in vars(args).items() if key not in ("compare", "output")},
+        "peak_rss_mb": _peak_rss_mb(),
+        "scenarios": scenarios,
+        "checks": checks,
+    }
+    path = Path(args.output) if args.output else RESULTS_DIR / f"{commit}.json"
+    path.write_text(json.dumps(results, indent=2))
+    return path
+
+
+def compare(old_path: str, new_path: str):
+    old = json.loads(Path(old_path).read_text())
+    new = json.loads(Path(new_path).read_text())
+    old_scenarios = {scenario["name"]: scenario for scenario in old["scenarios"]}
+    print(f"{'escenario':<28} {'p50 (ms)':>22} {'p99 (ms)':>22} {'req/s':>22}")
+    for scenario in new["scenarios"]:
+        before = old_scenarios.get(scenario["name"])
+        if before is None:
+            continue
+        columns = []
+        for key in ("p50_ms", "p99_ms", "throughput_rps"):
+            change = (scenario[key] - before[key]) / before[key] * 100 if before[key] else 0.0
+            columns.append(f"{before[key]:8.1f} -> {scenario[key]:8.1f} {change:+5.0f}%")
+        print(f"{scenario['name']:<28} " + " ".join(columns))
+    print(f"peak RSS: {old['peak_rss_mb']:.0f} MB ({old['commit']}) -> {new['peak_rss_mb']:.0f} MB ({new['commit']})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de la API de Jardín AR")
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--designs", type=int, default=50)
+    parser.add_argument("--items", type=int, default=20, help="items por diseño creado")
+    parser.add_argument("--reads", type=int, default=200, help="peticiones por escenario de listado")
+    parser.add_argument("--imports", type=int, default=10, help="peticiones por escenario de importación")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--high-concurrency", type=int, default=128, help="concurrencia de la comparación async/sync")
+    parser.add_argument("--screenshot-width", type=int, default=3000)
+    parser.add_argument("--screenshot-height", type=int, default=2000)
+    parser.add_argument("--output", help="ruta del JSON de resultados")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="compara dos resultados guardados")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    with tempfile.TemporaryDirectory(prefix="jardin-bench-") as workdir:
+        storage_dir = Path(workdir) / "storage"
+        storage_dir.mkdir()
+        cdn = _start_cdn(storage_dir)
+        _configure_environment(Path(workdir), storage_dir, cdn.server_address[1])
+        try:
+            # Importamos la app aquí, con el entorno ya configurado
+            sys.path.insert(0, str(BENCHMARKS_DIR.parent))
+            # httpx no ejecuta el lifespan de la app: aplicamos las migraciones aquí
+            from app.core.migrations import run_migrations
+            run_migrations()
+            scenarios, checks = asyncio.run(run_benchmarks(args))
+        finally:
+            cdn.shutdown()
+
+    path = _save(scenarios, checks, args)
+    print(f"Resultados guardados en {path}")
+    failed = [check["name"] for check in checks if not check["passed"]]
+    if failed:
+        print(f"ERROR: comprobaciones fallidas: {', '.join(failed)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+# migrations/env.py
+from logging.config import fileConfig
+
+from alembic import context
+
+from app.core.database import Base
+from app.core.migrations import migration_connection
+# Importamos los modelos para que sus tablas estén en Base.metadata
+from app.models import user as user_model, design as design_model, storage as storage_model
+
+config = context.config
+if config.config_file_name is not None and config.attributes.get("configure_logger", True):
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+
+# Objetos de la búsqueda creados a mano en las migraciones 0007 y 0008 (tabla
+# FTS5 de SQLite con sus tablas internas e índices GIN de Postgres): no están en
+# los modelos y la comparación (autogenerate) no debe proponer borrarlos
+SEARCH_OBJECTS = ("designs_fts", "ix_designs_search", "ix_designs_name_trgm", "ix_designs_items_text_trgm")
+
+
+def include_name(name, type_, parent_names):
+    return not (name or "").startswith(SEARCH_OBJECTS)
+
+
+def _run_migrations(connection):
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        include_name=include_name,
+        # SQLite no soporta casi ningún ALTER: Alembic recrea la tabla
+        render_as_batch=connection.dialect.name == "sqlite",
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    # Si nos llaman desde la app (app/core/migrations.py) ya traen la conexión;
+    # desde la línea de comandos usamos el mismo motor que la app
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        _run_migrations(connection)
+        return
+    with migration_connection() as connection:
+        _run_migrations(connection)
+
+
+if context.is_offline_mode():
+    raise RuntimeError("Las migraciones solo se pueden ejecutar contra una base de datos")
+run_migrations_online()
@@ -0,0 +1,51 @@
+"""Esquema inicial (el que creaba Base.metadata.create_all)
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "users",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("email", sa.String()),
+        sa.Column("hashed_password", sa.String()),
+    )
+    op.create_index("ix_users_id", "users", ["id"])
+    op.create_index("ix_users_email", "users", ["email"], unique=True)
+
+    op.create_table(
+        "designs",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("name", sa.String()),
+        sa.Column("screenshot_url", sa.String()),
+        sa.Column("owner_id", sa.Integer(), sa.ForeignKey("users.id")),
+    )
+    op.create_index("ix_designs_id", "designs", ["id"])
+    op.create_index("ix_designs_name", "designs", ["name"])
+
+    op.create_table(
+        "design_items",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("item_name", sa.String()),
+        sa.Column("quantity", sa.Integer()),
+        sa.Column("design_id", sa.Integer(), sa.ForeignKey("designs.id")),
+    )
+    op.create_index("ix_design_items_id", "design_items", ["id"])
+    op.create_index("ix_design_items_item_name", "design_items", ["item_name"])
+
+
+def downgrade():
+    op.drop_table("design_items")
+    op.drop_table("designs")
+    op.drop_table("users")
@@ -0,0 +1,31 @@
+"""Estado de la captura y miniatura en designs
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Algunas bases ya tienen estas columnas (se añadieron a mano antes de
+    # tener migraciones): solo creamos las que faltan
+    existing = {column["name"] for column in sa.inspect(op.get_bind()).get_columns("designs")}
+    with op.batch_alter_table("designs") as batch_op:
+        if "screenshot_status" not in existing:
+            batch_op.add_column(sa.Column("screenshot_status", sa.String(), nullable=False, server_default="ready"))
+        if "thumbnail_url" not in existing:
+            batch_op.add_column(sa.Column("thumbnail_url", sa.String()))
+
+
+def downgrade():
+    with op.batch_alter_table("designs") as batch_op:
+        batch_op.drop_column("thumbnail_url")
+        batch_op.drop_column("screenshot_status")
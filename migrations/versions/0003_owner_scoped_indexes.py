@@ -0,0 +1,61 @@
+"""Índices para las consultas por usuario y ON DELETE CASCADE en design_items
+
+Todas las consultas filtran por owner_id (listados) o design_id (items), que no
+tenían índice. Los índices sobre name e item_name no los usa ninguna consulta y
+los de id duplican el de la clave primaria: solo encarecían las escrituras.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+# Nombre para la FK sin nombre que crea SQLite, para poder reemplazarla
+_SQLITE_NAMING = {"fk": "fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s"}
+
+
+def _replace_design_fk(ondelete):
+    if op.get_bind().dialect.name == "sqlite":
+        with op.batch_alter_table("design_items", naming_convention=_SQLITE_NAMING, recreate="always") as batch_op:
+            batch_op.drop_constraint("fk_design_items_design_id_designs", type_="foreignkey")
+            batch_op.create_foreign_key(
+                "fk_design_items_design_id_designs", "designs", ["design_id"], ["id"], ondelete=ondelete
+            )
+    else:
+        op.drop_constraint("design_items_design_id_fkey", "design_items", type_="foreignkey")
+        op.create_foreign_key(
+            "design_items_design_id_fkey", "design_items", "designs", ["design_id"], ["id"], ondelete=ondelete
+        )
+
+
+def upgrade():
+    op.drop_index("ix_designs_name", table_name="designs")
+    op.drop_index("ix_designs_id", table_name="designs")
+    op.drop_index("ix_design_items_item_name", table_name="design_items")
+    op.drop_index("ix_design_items_id", table_name="design_items")
+
+    # (owner_id, id): filtro por usuario + orden/cursor por id en el mismo índice
+    op.create_index("ix_designs_owner_id_id", "designs", ["owner_id", "id"])
+    op.create_index("ix_design_items_design_id", "design_items", ["design_id"])
+
+    # Al borrar un diseño la BD borra sus items, sin que el ORM tenga que cargarlos
+    _replace_design_fk("CASCADE")
+
+
+def downgrade():
+    _replace_design_fk(None)
+
+    op.drop_index("ix_design_items_design_id", table_name="design_items")
+    op.drop_index("ix_designs_owner_id_id", table_name="designs")
+
+    op.create_index("ix_design_items_id", "design_items", ["id"])
+    op.create_index("ix_design_items_item_name", "design_items", ["item_name"])
+    op.create_index("ix_designs_id", "designs", ["id"])
+    op.create_index("ix_designs_name", "designs", ["name"])
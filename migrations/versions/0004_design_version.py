@@ -0,0 +1,27 @@
+"""Columna version en designs para la concurrencia optimista de PATCH
+
+Cada edición (PATCH /designs/{id}) incrementa la versión y solo se aplica si el
+cliente envía la versión que leyó; los diseños existentes empiezan en 1.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("designs") as batch_op:
+        batch_op.add_column(sa.Column("version", sa.Integer(), nullable=False, server_default="1"))
+
+
+def downgrade():
+    with op.batch_alter_table("designs") as batch_op:
+        batch_op.drop_column("version")
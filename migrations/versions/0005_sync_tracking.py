@@ -0,0 +1,51 @@
+"""updated_at en designs y design_items, y registro de diseños eliminados
+
+Permite responder con ETag/Last-Modified y la sincronización incremental
+(GET /designs/changes?since=...). Las filas existentes toman la hora de la migración.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def _recreate():
+    # SQLite no admite ADD COLUMN con un valor por defecto no constante
+    # (CURRENT_TIMESTAMP): en ese caso se recrea la tabla
+    return "always" if op.get_bind().dialect.name == "sqlite" else "auto"
+
+
+def upgrade():
+    for table in ("designs", "design_items"):
+        with op.batch_alter_table(table, recreate=_recreate()) as batch_op:
+            batch_op.add_column(
+                sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now())
+            )
+    op.create_index("ix_designs_owner_id_updated_at", "designs", ["owner_id", "updated_at"])
+
+    op.create_table(
+        "deleted_designs",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("design_id", sa.Integer(), nullable=False),
+        sa.Column("owner_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("deleted_at", sa.DateTime(timezone=True), nullable=False),
+    )
+    op.create_index("ix_deleted_designs_owner_id_deleted_at", "deleted_designs", ["owner_id", "deleted_at"])
+
+
+def downgrade():
+    op.drop_index("ix_deleted_designs_owner_id_deleted_at", table_name="deleted_designs")
+    op.drop_table("deleted_designs")
+
+    op.drop_index("ix_designs_owner_id_updated_at", table_name="designs")
+    for table in ("design_items", "designs"):
+        with op.batch_alter_table(table, recreate=_recreate()) as batch_op:
+            batch_op.drop_column("updated_at")
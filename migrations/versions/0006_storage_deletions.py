@@ -0,0 +1,32 @@
+"""Cola (outbox) de borrados del almacenamiento
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "storage_deletions",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("url", sa.String(), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("next_attempt_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("last_error", sa.String()),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+    )
+    op.create_index("ix_storage_deletions_next_attempt_at", "storage_deletions", ["next_attempt_at"])
+
+
+def downgrade():
+    op.drop_index("ix_storage_deletions_next_attempt_at", table_name="storage_deletions")
+    op.drop_table("storage_deletions")
@@ -0,0 +1,117 @@
+"""Búsqueda por nombre de diseño y de sus items (GET /designs/search)
+
+- designs.items_text: nombres de los items del diseño separados por saltos de
+  línea (lo mantiene app/crud/design.py al crear, importar y editar).
+- SQLite: tabla FTS5 "designs_fts" de contenido externo (lee designs) con
+  name, items_text y owner_id, sincronizada con triggers sobre designs.
+- Postgres: índice GIN sobre el tsvector ponderado (nombre A, items B) y
+  trigramas (pg_trgm) sobre name e items_text para buscar subcadenas.
+  pg_trgm es una extensión "trusted" (PG 13+): basta con ser dueño de la base.
+
+Ninguno de estos objetos está en los modelos (migrations/env.py los excluye
+de la comparación). OJO: en SQLite, una migración posterior que recree la
+tabla designs (batch) elimina sus triggers; hay que volver a crearlos.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+# La migración 0008 rehace estos índices sin acentos (immutable_unaccent)
+PG_SEARCH_VECTOR = (
+    "setweight(to_tsvector('simple', coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(items_text, '')), 'B')"
+)
+
+SQLITE_FTS_COLUMNS = "name, items_text, owner_id"
+
+SQLITE_UPGRADE = [
+    f"""
+    CREATE VIRTUAL TABLE designs_fts USING fts5(
+        {SQLITE_FTS_COLUMNS}, content='designs', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    f"""
+    CREATE TRIGGER designs_fts_insert AFTER INSERT ON designs BEGIN
+        INSERT INTO designs_fts(rowid, {SQLITE_FTS_COLUMNS})
+        VALUES (new.id, new.name, new.items_text, new.owner_id);
+    END
+    """,
+    f"""
+    CREATE TRIGGER designs_fts_delete AFTER DELETE ON designs BEGIN
+        INSERT INTO designs_fts(designs_fts, rowid, {SQLITE_FTS_COLUMNS})
+        VALUES ('delete', old.id, old.name, old.items_text, old.owner_id);
+    END
+    """,
+    # Solo cuando cambian las columnas indexadas (no al terminar una subida, p. ej.)
+    f"""
+    CREATE TRIGGER designs_fts_update AFTER UPDATE OF {SQLITE_FTS_COLUMNS} ON designs BEGIN
+        INSERT INTO designs_fts(designs_fts, rowid, {SQLITE_FTS_COLUMNS})
+        VALUES ('delete', old.id, old.name, old.items_text, old.owner_id);
+        INSERT INTO designs_fts(rowid, {SQLITE_FTS_COLUMNS})
+        VALUES (new.id, new.name, new.items_text, new.owner_id);
+    END
+    """,
+    "INSERT INTO designs_fts(designs_fts) VALUES ('rebuild')",
+]
+
+SQLITE_DOWNGRADE = [
+    "DROP TRIGGER IF EXISTS designs_fts_update",
+    "DROP TRIGGER IF EXISTS designs_fts_delete",
+    "DROP TRIGGER IF EXISTS designs_fts_insert",
+    "DROP TABLE IF EXISTS designs_fts",
+]
+
+POSTGRES_UPGRADE = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    f"CREATE INDEX ix_designs_search ON designs USING gin (({PG_SEARCH_VECTOR}))",
+    "CREATE INDEX ix_designs_name_trgm ON designs USING gin (name gin_trgm_ops)",
+    "CREATE INDEX ix_designs_items_text_trgm ON designs USING gin (items_text gin_trgm_ops)",
+]
+
+POSTGRES_DOWNGRADE = [
+    "DROP INDEX IF EXISTS ix_designs_items_text_trgm",
+    "DROP INDEX IF EXISTS ix_designs_name_trgm",
+    "DROP INDEX IF EXISTS ix_designs_search",
+]
+
+
+def _backfill_items_text():
+    designs = sa.table("designs", sa.column("id"), sa.column("items_text"))
+    items = sa.table("design_items", sa.column("design_id"), sa.column("item_name"))
+    op.execute(
+        designs.update().values(
+            items_text=sa.select(sa.func.aggregate_strings(items.c.item_name, "\n"))
+            .where(items.c.design_id == designs.c.id)
+            .scalar_subquery()
+        )
+    )
+
+
+def upgrade():
+    op.add_column("designs", sa.Column("items_text", sa.String()))
+    _backfill_items_text()
+
+    dialect = op.get_bind().dialect.name
+    statements = {"sqlite": SQLITE_UPGRADE, "postgresql": POSTGRES_UPGRADE}.get(dialect, [])
+    for statement in statements:
+        op.execute(statement)
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    statements = {"sqlite": SQLITE_DOWNGRADE, "postgresql": POSTGRES_DOWNGRADE}.get(dialect, [])
+    for statement in statements:
+        op.execute(statement)
+
+    with op.batch_alter_table("designs") as batch_op:
+        batch_op.drop_column("items_text")
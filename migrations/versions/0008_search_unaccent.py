@@ -0,0 +1,72 @@
+"""Búsqueda sin acentos en Postgres ("jardin" encuentra "Jardín")
+
+SQLite ya los ignora (tokenize 'unicode61 remove_diacritics 2' en 0007). En
+Postgres se añade la extensión unaccent y se rehacen los índices de la búsqueda
+sobre el texto sin acentos. unaccent() no es IMMUTABLE (depende del
+search_path y del diccionario), así que no puede usarse en un índice: se
+envuelve en immutable_unaccent(), que fija el esquema y el diccionario.
+unaccent es una extensión "trusted" (PG 13+), igual que pg_trgm.
+
+Las consultas de app/crud/design.py usan las mismas expresiones; si cambian
+aquí hay que cambiarlas allí o los índices no se usarán.
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+# Misma expresión que _PG_SEARCH_VECTOR en app/crud/design.py
+PG_SEARCH_VECTOR = (
+    "setweight(to_tsvector('simple', immutable_unaccent(coalesce(name, ''))), 'A') || "
+    "setweight(to_tsvector('simple', immutable_unaccent(coalesce(items_text, ''))), 'B')"
+)
+
+# Expresiones de 0007, para el downgrade
+PG_SEARCH_VECTOR_0007 = (
+    "setweight(to_tsvector('simple', coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(items_text, '')), 'B')"
+)
+
+POSTGRES_UPGRADE = [
+    "CREATE EXTENSION IF NOT EXISTS unaccent",
+    """
+    CREATE OR REPLACE FUNCTION immutable_unaccent(text) RETURNS text
+    LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+    AS $$ SELECT public.unaccent('public.unaccent'::regdictionary, $1) $$
+    """,
+    "DROP INDEX IF EXISTS ix_designs_search",
+    "DROP INDEX IF EXISTS ix_designs_name_trgm",
+    "DROP INDEX IF EXISTS ix_designs_items_text_trgm",
+    f"CREATE INDEX ix_designs_search ON designs USING gin (({PG_SEARCH_VECTOR}))",
+    "CREATE INDEX ix_designs_name_trgm ON designs USING gin (immutable_unaccent(name) gin_trgm_ops)",
+    "CREATE INDEX ix_designs_items_text_trgm ON designs USING gin (immutable_unaccent(items_text) gin_trgm_ops)",
+]
+
+POSTGRES_DOWNGRADE = [
+    "DROP INDEX IF EXISTS ix_designs_items_text_trgm",
+    "DROP INDEX IF EXISTS ix_designs_name_trgm",
+    "DROP INDEX IF EXISTS ix_designs_search",
+    f"CREATE INDEX ix_designs_search ON designs USING gin (({PG_SEARCH_VECTOR_0007}))",
+    "CREATE INDEX ix_designs_name_trgm ON designs USING gin (name gin_trgm_ops)",
+    "CREATE INDEX ix_designs_items_text_trgm ON designs USING gin (items_text gin_trgm_ops)",
+    "DROP FUNCTION IF EXISTS immutable_unaccent(text)",
+]
+
+
+def upgrade():
+    if op.get_bind().dialect.name == "postgresql":
+        for statement in POSTGRES_UPGRADE:
+            op.execute(statement)
+
+
+def downgrade():
+    if op.get_bind().dialect.name == "postgresql":
+        for statement in POSTGRES_DOWNGRADE:
+            op.execute(statement)
@@ -0,0 +1,26 @@
+"""Índices sobre las URLs de las imágenes de los diseños
+
+Antes de borrar un archivo, la cola de borrados comprueba que ningún diseño
+lo siga usando (app/services/storage_deletions.py).
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+
+revision = "0009"
+down_revision = "0008"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index("ix_designs_screenshot_url", "designs", ["screenshot_url"])
+    op.create_index("ix_designs_thumbnail_url", "designs", ["thumbnail_url"])
+
+
+def downgrade():
+    op.drop_index("ix_designs_thumbnail_url", table_name="designs")
+    op.drop_index("ix_designs_screenshot_url", table_name="designs")
@@ -0,0 +1,46 @@
+# tests/conftest.py
+# La app lee la configuración al importarse: fijamos el entorno antes de importarla.
+# Cada ejecución usa una SQLite nueva y el almacenamiento local.
+import os
+import tempfile
+
+import pytest
+
+_workdir = tempfile.mkdtemp(prefix="jardin-tests-")
+os.environ.update({
+    "DATABASE_URL": f"sqlite:///{_workdir}/test.sqlite",
+    "SECRET_KEY": "tests",
+    "ACCESS_TOKEN_EXPIRE_MINUTES": "30",
+    "STORAGE_BACKEND": "local",
+    "LOCAL_STORAGE_DIR": os.path.join(_workdir, "storage"),
+    "RATE_LIMIT_ENABLED": "false",
+    "STORAGE_DELETE_WORKER": "false",
+    "PDF_CACHE_BACKEND": "memory",
+})
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.main import app  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+def _login(client, email: str) -> dict:
+    credentials = {"email": email, "password": "tests-password"}
+    client.post("/users/", json=credentials)
+    response = client.post("/token", data={"username": credentials["email"], "password": credentials["password"]})
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+@pytest.fixture(scope="session")
+def auth_headers(client):
+    return _login(client, "tests@jardin.test")
+
+
+@pytest.fixture(scope="session")
+def other_auth_headers(client):
+    return _login(client, "otro@jardin.test")
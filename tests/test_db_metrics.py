@@ -0,0 +1,22 @@
+# tests/test_db_metrics.py
+from sqlalchemy import create_engine, text
+
+from app.core import db_metrics
+
+
+def test_pool_stats_follow_the_engine_after_dispose(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'pool.sqlite'}", poolclass=db_metrics.InstrumentedQueuePool)
+    db_metrics.instrument_engine(engine, "tests")
+    try:
+        engine.dispose()
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+            stats = db_metrics.get_pool_stats()["tests"]
+            # El pool nuevo: la conexión abierta es suya y sigue midiendo la espera
+            assert stats["checked_out"] == 1
+            assert stats["checkouts"] == 1
+            assert stats["checkout_wait_seconds_total"] > 0
+    finally:
+        engine.dispose()
+        db_metrics._pool_metrics.pop("tests")
+        db_metrics._engines.pop("tests")
@@ -0,0 +1,20 @@
+# tests/test_design_export.py
+from app.routers import designs as designs_router
+from app.schemas import design as design_schema
+
+
+def test_export_rejects_too_many_ids(client, auth_headers):
+    design_ids = list(range(1, design_schema.MAX_EXPORT_DESIGNS + 2))
+    response = client.post("/designs/export", headers=auth_headers, json={"design_ids": design_ids})
+    assert response.status_code == 422
+
+
+def test_export_all_stops_at_the_limit(client, auth_headers, monkeypatch):
+    response = client.post("/designs/import", headers=auth_headers, json=[
+        {"name": f"Exportación {i}", "items": [{"item_name": "romero", "quantity": 1}]} for i in range(3)
+    ])
+    assert response.status_code == 201
+    monkeypatch.setattr(designs_router, "MAX_EXPORT_DESIGNS", 2)
+
+    response = client.post("/designs/export", headers=auth_headers, json={"format": "pdf"})
+    assert response.status_code == 400
@@ -0,0 +1,32 @@
+# tests/test_design_import.py
+import pytest
+
+from app.services.storage import get_storage
+
+
+@pytest.mark.parametrize("url", [
+    "http://169.254.169.254/latest/meta-data/",
+    "https://res.cloudinary.com/otra-cuenta/image/upload/v1/foto.jpg",
+    "file:///etc/passwd",
+])
+def test_import_rejects_foreign_images(client, auth_headers, url):
+    response = client.post("/designs/import", headers=auth_headers, json=[
+        {"name": "Ajena", "items": [], "screenshot_url": url},
+    ])
+    assert response.status_code == 400
+
+
+def test_import_rejects_paths_outside_the_storage(client, auth_headers):
+    response = client.post("/designs/import", headers=auth_headers, json=[
+        {"name": "Ajena", "items": [], "thumbnail_url": f"{get_storage().base_url}/../fuera.jpg"},
+    ])
+    assert response.status_code == 400
+
+
+def test_import_accepts_own_images(client, auth_headers):
+    url = f"{get_storage().base_url}/captura.jpg"
+    response = client.post("/designs/import", headers=auth_headers, json=[
+        {"name": "Propia", "items": [], "screenshot_url": url},
+    ])
+    assert response.status_code == 201
+    assert response.json()[0]["screenshot_url"] == url
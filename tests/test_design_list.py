@@ -0,0 +1,19 @@
+# tests/test_design_list.py
+from app.routers import designs as designs_router
+
+
+def test_list_without_paging_parameters_returns_every_design(client, auth_headers):
+    count = designs_router.DEFAULT_PAGE_SIZE + 5
+    response = client.post("/designs/import", headers=auth_headers, json=[
+        {"name": f"Listado {i}", "items": []} for i in range(count)
+    ])
+    assert response.status_code == 201
+
+    everything = client.get("/designs/", headers=auth_headers)
+    assert len(everything.json()) >= count
+    assert "X-Next-Cursor" not in everything.headers
+
+    # Con after_id (o limit) se pagina: tamaño por defecto y cursor
+    page = client.get("/designs/", params={"after_id": 0}, headers=auth_headers)
+    assert len(page.json()) == designs_router.DEFAULT_PAGE_SIZE
+    assert page.headers["X-Next-Cursor"] == str(page.json()[-1]["id"])
@@ -0,0 +1,74 @@
+# tests/test_design_pdf.py
+import io
+
+import pytest
+from PIL import Image
+
+from app.services import image_fetcher, pdf_cache
+from app.services.storage import get_storage
+
+
+class _StubFetcher:
+    def __init__(self, data: bytes | None):
+        self.data = data
+
+    def fetch_bytes(self, url: str) -> bytes:
+        if self.data is None:
+            raise ConnectionError("CDN no disponible")
+        return self.data
+
+
+def _png() -> bytes:
+    output = io.BytesIO()
+    Image.new("RGB", (40, 30), "green").save(output, format="PNG")
+    return output.getvalue()
+
+
+@pytest.fixture
+def cache():
+    cache = pdf_cache.MemoryPDFCache(16 * 1024 * 1024)
+    pdf_cache.set_pdf_cache(cache)
+    yield cache
+    pdf_cache.set_pdf_cache(None)
+
+
+@pytest.fixture
+def design_id(client, auth_headers):
+    response = client.post("/designs/import", headers=auth_headers, json=[{
+        "name": "Jardin con imagen",
+        "items": [{"item_name": "rosal", "quantity": 2}],
+        "screenshot_url": f"{get_storage().base_url}/captura.png",
+    }])
+    assert response.status_code == 201
+    return response.json()[0]["id"]
+
+
+def test_pdf_without_image_is_not_cached(client, auth_headers, cache, design_id):
+    image_fetcher.set_image_fetcher(_StubFetcher(None))
+    try:
+        response = client.get(f"/designs/{design_id}/pdf", headers=auth_headers)
+    finally:
+        image_fetcher.set_image_fetcher(None)
+
+    assert response.status_code == 200
+    assert response.content.startswith(b"%PDF")
+    assert "etag" not in response.headers
+    assert response.headers["cache-control"] == "no-store"
+    assert cache.current_bytes == 0
+
+
+def test_pdf_is_regenerated_once_the_image_loads(client, auth_headers, cache, design_id):
+    image_fetcher.set_image_fetcher(_StubFetcher(None))
+    try:
+        client.get(f"/designs/{design_id}/pdf", headers=auth_headers)
+        image_fetcher.set_image_fetcher(_StubFetcher(_png()))
+        response = client.get(f"/designs/{design_id}/pdf", headers=auth_headers)
+    finally:
+        image_fetcher.set_image_fetcher(None)
+
+    assert response.status_code == 200
+    etag = response.headers["etag"]
+    assert cache.current_bytes == len(response.content)
+
+    not_modified = client.get(f"/designs/{design_id}/pdf", headers={**auth_headers, "If-None-Match": etag})
+    assert not_modified.status_code == 304
@@ -0,0 +1,17 @@
+# tests/test_design_search.py
+# Corre contra el motor de DATABASE_URL: en Postgres comprueba immutable_unaccent
+# (migración 0008) y en SQLite el tokenizador de FTS5.
+
+
+def test_search_ignores_accents(client, auth_headers):
+    response = client.post("/designs/import", headers=auth_headers, json=[
+        {"name": "Pérgola andaluza", "items": [{"item_name": "Jazmín", "quantity": 1}]},
+        {"name": "Huerto de cítricos", "items": [{"item_name": "Limonero", "quantity": 2}]},
+    ])
+    assert response.status_code == 201
+    pergola_id, orchard_id = (design["id"] for design in response.json())
+
+    for query, expected in [("pergola andaluza", pergola_id), ("PÉRGOLA", pergola_id), ("jazmin", pergola_id), ("citricos", orchard_id)]:
+        response = client.get("/designs/search", params={"q": query}, headers=auth_headers)
+        assert response.status_code == 200
+        assert [result["id"] for result in response.json()] == [expected], query
@@ -0,0 +1,133 @@
+# tests/test_design_updates.py
+# PATCH con control de versión, sincronización incremental (/designs/changes),
+# ETag del listado y límite de peticiones.
+import io
+import json
+from datetime import datetime, timezone
+
+import pytest
+from PIL import Image
+
+from app.core import rate_limit
+from app.services import storage_deletions, uploads
+from app.services.storage import get_storage
+
+
+def _jpeg(color: str) -> bytes:
+    output = io.BytesIO()
+    Image.new("RGB", (40, 30), color).save(output, format="JPEG")
+    return output.getvalue()
+
+
+def _patch(client, headers, design_id: int, changes: dict, screenshot: bytes | None = None):
+    files = {"screenshot_file": ("captura.jpg", screenshot, "image/jpeg")} if screenshot else None
+    return client.patch(f"/designs/{design_id}", headers=headers, data={"design_data": json.dumps(changes)}, files=files)
+
+
+@pytest.fixture
+def design(client, auth_headers):
+    response = client.post("/designs/import", headers=auth_headers, json=[{
+        "name": "Rocalla", "items": [{"item_name": "sedum", "quantity": 3}, {"item_name": "tomillo", "quantity": 1}],
+    }])
+    return response.json()[0]
+
+
+def test_patch_applies_item_changes_and_refreshes_search(client, auth_headers, design):
+    sedum, tomillo = design["items"]
+    response = _patch(client, auth_headers, design["id"], {
+        "version": design["version"],
+        "name": "Rocalla seca",
+        "add_items": [{"item_name": "siempreviva", "quantity": 2}],
+        "update_items": [{"id": sedum["id"], "quantity": 5}],
+        "remove_item_ids": [tomillo["id"]],
+    })
+    assert response.status_code == 200
+    updated = response.json()
+    assert updated["version"] == design["version"] + 1
+    assert updated["name"] == "Rocalla seca"
+    assert [(item["item_name"], item["quantity"]) for item in updated["items"]] == [("sedum", 5), ("siempreviva", 2)]
+
+    # items_text se recalcula: la búsqueda encuentra el item nuevo y no el quitado
+    found = client.get("/designs/search", params={"q": "siempreviva"}, headers=auth_headers).json()
+    assert [hit["id"] for hit in found] == [design["id"]]
+    assert client.get("/designs/search", params={"q": "tomillo"}, headers=auth_headers).json() == []
+
+
+def test_patch_with_stale_version_returns_409(client, auth_headers, design):
+    assert _patch(client, auth_headers, design["id"], {"version": design["version"], "name": "Primera"}).status_code == 200
+    response = _patch(client, auth_headers, design["id"], {"version": design["version"], "name": "Segunda"})
+    assert response.status_code == 409
+    assert client.get(f"/designs/{design['id']}", headers=auth_headers).json()["name"] == "Primera"
+
+
+def test_patch_with_item_of_another_design_returns_404(client, auth_headers, design):
+    other = client.post("/designs/import", headers=auth_headers, json=[
+        {"name": "Otro", "items": [{"item_name": "hiedra", "quantity": 1}]},
+    ]).json()[0]
+    response = _patch(client, auth_headers, design["id"], {
+        "version": design["version"], "remove_item_ids": [other["items"][0]["id"]],
+    })
+    assert response.status_code == 404
+    assert len(client.get(f"/designs/{other['id']}", headers=auth_headers).json()["items"]) == 1
+
+
+def test_patch_replaces_screenshot_and_deletes_the_old_one(client, auth_headers):
+    response = client.post(
+        "/designs/",
+        headers=auth_headers,
+        data={"design_data": json.dumps({"name": "Con captura", "items": []})},
+        files={"screenshot_file": ("captura.jpg", _jpeg("green"), "image/jpeg")},
+    )
+    design_id = response.json()["id"]
+    uploads.shutdown()  # espera a que termine la subida
+    original = client.get(f"/designs/{design_id}", headers=auth_headers).json()
+    old_path = get_storage().directory / get_storage().key(original["screenshot_url"])
+
+    response = _patch(client, auth_headers, design_id, {"version": original["version"]}, _jpeg("blue"))
+    assert response.status_code == 200
+    assert response.json()["screenshot_status"] == uploads.SCREENSHOT_PENDING
+    uploads.shutdown()
+    storage_deletions.drain()
+
+    replaced = client.get(f"/designs/{design_id}", headers=auth_headers).json()
+    assert replaced["screenshot_status"] == uploads.SCREENSHOT_READY
+    assert replaced["screenshot_url"] != original["screenshot_url"]
+    assert (get_storage().directory / get_storage().key(replaced["screenshot_url"])).exists()
+    assert not old_path.exists()
+
+
+def test_changes_feed_reports_changed_and_deleted_designs(client, auth_headers, design):
+    since = datetime.now(timezone.utc).isoformat()
+    assert _patch(client, auth_headers, design["id"], {"version": design["version"], "name": "Cambiado"}).status_code == 200
+    deleted = client.post("/designs/import", headers=auth_headers, json=[{"name": "Efímero", "items": []}]).json()[0]
+    assert client.delete(f"/designs/{deleted['id']}", headers=auth_headers).status_code == 204
+
+    changes = client.get("/designs/changes", params={"since": since}, headers=auth_headers).json()
+    assert design["id"] in [changed["id"] for changed in changes["changed"]]
+    assert deleted["id"] in changes["deleted_ids"]
+    assert deleted["id"] not in [changed["id"] for changed in changes["changed"]]
+    assert not changes["full_resync"]
+
+
+def test_list_etag_returns_304_until_something_changes(client, auth_headers, design):
+    params = {"limit": 200}
+    first = client.get("/designs/", params=params, headers=auth_headers)
+    etag = first.headers["ETag"]
+
+    again = client.get("/designs/", params=params, headers={**auth_headers, "If-None-Match": etag})
+    assert again.status_code == 304
+
+    assert _patch(client, auth_headers, design["id"], {"version": design["version"], "name": "Nuevo nombre"}).status_code == 200
+    changed = client.get("/designs/", params=params, headers={**auth_headers, "If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+
+
+def test_rate_limit_returns_429_with_retry_after(client, other_auth_headers, monkeypatch):
+    monkeypatch.setattr(rate_limit, "RATE_LIMIT_ENABLED", True)
+    monkeypatch.setitem(rate_limit.POLICIES, "default", rate_limit.Policy("default", rate_limit.Rate.parse("2/m")))
+
+    statuses = [client.get("/designs/summary", headers=other_auth_headers).status_code for _ in range(3)]
+    assert statuses == [200, 200, 429]
+    response = client.get("/designs/summary", headers=other_auth_headers)
+    assert int(response.headers["Retry-After"]) >= 1
@@ -0,0 +1,19 @@
+# tests/test_identity_cache.py
+from app.core.identity_cache import IdentityCache
+from app.schemas import user as user_schema
+
+
+def _user(user_id: int):
+    return user_schema.User(id=user_id, email=f"u{user_id}@jardin.test")
+
+
+def test_identity_cache_evicts_the_least_recently_used():
+    cache = IdentityCache(ttl=60, max_entries=2)
+    cache.set("a", _user(1))
+    cache.set("b", _user(2))
+    assert cache.get("a").id == 1  # "a" pasa a ser la más reciente
+
+    cache.set("c", _user(3))
+    assert cache.get("b") is None
+    assert cache.get("a").id == 1
+    assert cache.get("c").id == 3
@@ -0,0 +1,18 @@
+# tests/test_metrics.py
+from app.routers import metrics as metrics_router
+
+
+def test_metrics_are_disabled_without_a_token(client, monkeypatch):
+    monkeypatch.setattr(metrics_router, "METRICS_TOKEN", None)
+    assert client.get("/metrics").status_code == 404
+    assert client.get("/metrics/storage-deletions").status_code == 404
+
+
+def test_metrics_require_the_token(client, monkeypatch):
+    monkeypatch.setattr(metrics_router, "METRICS_TOKEN", "secreto")
+    assert client.get("/metrics/db-pool").status_code == 401
+    assert client.get("/metrics/db-pool", headers={"Authorization": "Bearer otro"}).status_code == 401
+
+    response = client.get("/metrics", headers={"Authorization": "Bearer secreto"})
+    assert response.status_code == 200
+    assert "http_request_duration_seconds" in response.text
@@ -0,0 +1,46 @@
+# tests/test_storage.py
+from app.services.storage import CloudinaryStorage
+
+
+class _FakeUploader:
+    def __init__(self):
+        self.calls = []
+
+    def upload(self, data, **options):
+        self.calls.append(options)
+        return {"secure_url": "https://res.cloudinary.com/cuenta/image/upload/v1/jardin/nuevo.jpg"}
+
+
+class _FakeApi:
+    def __init__(self):
+        self.calls = []
+
+    def resources(self, **options):
+        self.calls.append(options)
+        return {"resources": [{
+            "secure_url": "https://res.cloudinary.com/cuenta/image/upload/v1/jardin/viejo.jpg",
+            "created_at": "2026-01-01T00:00:00Z",
+        }]}
+
+
+def _storage():
+    storage = CloudinaryStorage(folder="jardin")
+    storage.cloud_name = "cuenta"
+    storage.uploader, storage.api = _FakeUploader(), _FakeApi()
+    return storage
+
+
+def test_cloudinary_uploads_and_lists_only_its_folder():
+    storage = _storage()
+    url = storage.upload(b"imagen")
+    assert storage.uploader.calls[0]["folder"] == "jardin"
+    assert storage.owns(url)
+
+    assert [url for url, _ in storage.iter_files()] == ["https://res.cloudinary.com/cuenta/image/upload/v1/jardin/viejo.jpg"]
+    assert storage.api.calls[0]["prefix"] == "jardin/"
+
+
+def test_cloudinary_does_not_own_other_folders():
+    storage = _storage()
+    assert not storage.owns("https://res.cloudinary.com/cuenta/image/upload/v1/otra/foto.jpg")
+    assert not storage.owns("https://res.cloudinary.com/cuenta/image/upload/v1/foto.jpg")
@@ -0,0 +1,45 @@
+# tests/test_storage_deletions.py
+import io
+import json
+
+from PIL import Image
+
+from app.services import storage_deletions, uploads
+from app.services.storage import get_storage
+
+
+def _jpeg() -> bytes:
+    output = io.BytesIO()
+    Image.new("RGB", (40, 30), "green").save(output, format="JPEG")
+    return output.getvalue()
+
+
+def test_shared_image_is_kept_while_a_design_uses_it(client, auth_headers, other_auth_headers):
+    response = client.post(
+        "/designs/",
+        headers=auth_headers,
+        data={"design_data": json.dumps({"name": "Original", "items": []})},
+        files={"screenshot_file": ("captura.jpg", _jpeg(), "image/jpeg")},
+    )
+    design_id = response.json()["id"]
+    uploads.shutdown()  # espera a que termine la subida
+    original = client.get(f"/designs/{design_id}", headers=auth_headers).json()
+    path = get_storage().directory / get_storage().key(original["screenshot_url"])
+    assert path.exists()
+
+    # Otro usuario importa un diseño con la misma imagen y lo elimina
+    response = client.post("/designs/import", headers=other_auth_headers, json=[{
+        "name": "Copia", "items": [],
+        "screenshot_url": original["screenshot_url"], "thumbnail_url": original["thumbnail_url"],
+    }])
+    copy_id = response.json()[0]["id"]
+    assert client.delete(f"/designs/{copy_id}", headers=other_auth_headers).status_code == 204
+
+    storage_deletions.drain()
+    assert path.exists()
+    assert client.get(f"/designs/{design_id}", headers=auth_headers).json()["screenshot_url"] == original["screenshot_url"]
+
+    # Cuando el último diseño que la usa se elimina, el archivo sí se borra
+    assert client.delete(f"/designs/{design_id}", headers=auth_headers).status_code == 204
+    storage_deletions.drain()
+    assert not path.exists()
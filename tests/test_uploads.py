@@ -0,0 +1,67 @@
+# tests/test_uploads.py
+import io
+import json
+
+from fastapi.testclient import TestClient
+from PIL import Image
+
+from app.main import app
+from app.services import uploads
+
+
+def _jpeg() -> bytes:
+    output = io.BytesIO()
+    Image.new("RGB", (40, 30), "green").save(output, format="JPEG")
+    return output.getvalue()
+
+
+def _create_design(client, auth_headers, name: str) -> int:
+    response = client.post(
+        "/designs/",
+        headers=auth_headers,
+        data={"design_data": json.dumps({"name": name, "items": []})},
+        files={"screenshot_file": ("captura.jpg", _jpeg(), "image/jpeg")},
+    )
+    assert response.status_code == 200
+    return response.json()["id"]
+
+
+def test_uploads_work_after_another_lifespan(client, auth_headers):
+    # Un segundo arranque y apagado de la app en el mismo proceso cierra el pool
+    with TestClient(app):
+        pass
+
+    design_id = _create_design(client, auth_headers, "Tras otro arranque")
+    uploads.shutdown()  # espera a que termine la subida
+
+    response = client.get(f"/designs/{design_id}", headers=auth_headers)
+    assert response.json()["screenshot_status"] == uploads.SCREENSHOT_READY
+
+
+def test_upload_error_after_processing_marks_design_failed(client, auth_headers, monkeypatch, caplog):
+    def broken_queue(db, urls):
+        raise RuntimeError("base de datos no disponible")
+
+    monkeypatch.setattr(uploads.storage_crud, "queue_deletions", broken_queue)
+    design_id = _create_design(client, auth_headers, "Con error al guardar")
+    uploads.shutdown()
+
+    response = client.get(f"/designs/{design_id}", headers=auth_headers)
+    assert response.json()["screenshot_status"] == uploads.SCREENSHOT_FAILED
+    assert "base de datos no disponible" in caplog.text
+
+
+def test_full_upload_queue_returns_503_before_saving(client, auth_headers, monkeypatch):
+    monkeypatch.setattr(uploads, "UPLOAD_MAX_PENDING", 0)
+    response = client.post(
+        "/designs/",
+        headers=auth_headers,
+        data={"design_data": json.dumps({"name": "Cola llena", "items": []})},
+        files={"screenshot_file": ("captura.jpg", _jpeg(), "image/jpeg")},
+    )
+    assert response.status_code == 503
+    assert response.headers["Retry-After"]
+
+    names = [design["name"] for design in client.get("/designs/search", params={"q": "cola llena"}, headers=auth_headers).json()]
+    assert "Cola llena" not in names
+    assert uploads.get_stats()["pending"] == 0